@@ -0,0 +1,12 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# DJANGO_ENV selects the settings profile: "development" (the default) or
+# "production". Both build on base.py.
+if os.environ.get("DJANGO_ENV", "development") == "production":
+    from .production import *  # noqa: F401,F403
+else:
+    from .development import *  # noqa: F401,F403
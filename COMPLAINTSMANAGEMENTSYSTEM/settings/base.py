@@ -1,22 +1,20 @@
 from pathlib import Path
-from dotenv import load_dotenv
 import os
 
 
-load_dotenv()
+# Settings shared by every profile; see __init__.py for how one is chosen.
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
-ALLOWED_HOSTS = [
-    "*",
-]
+ALLOWED_HOSTS = []
 
 # Application definition
 INSTALLED_APPS = [
@@ -38,6 +36,8 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = "bootstrap4"
 
 MIDDLEWARE = [
+    "complaints.middleware.RequestMetricsMiddleware",
+    "complaints.middleware.QueryLogMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,7 +52,8 @@ ROOT_URLCONF = "COMPLAINTSMANAGEMENTSYSTEM.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "complaints.template_backend.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [os.path.join(BASE_DIR, "complaints", "templates")],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -66,8 +67,23 @@ TEMPLATES = [
     },
 ]
 
+# Requests kept per view for the staff metrics page, and whether responses
+# carry their timings in a Server-Timing header.
+REQUEST_METRICS_WINDOW = 500
+SERVER_TIMING_HEADER = True
+
+# Development/staging query log (see QueryLogMiddleware): set QUERY_LOG_PATH
+# to a JSONL file to record queries slower than SLOW_QUERY_MS, exact repeats
+# and statements run REPEATED_QUERY_COUNT times in one request.
+QUERY_LOG_PATH = os.environ.get("QUERY_LOG_PATH")
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+REPEATED_QUERY_COUNT = 5
+
 WSGI_APPLICATION = "COMPLAINTSMANAGEMENTSYSTEM.wsgi.application"
 
+# Compile all project templates when wsgi.py is imported.
+WARM_TEMPLATES_AT_BOOT = False
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -124,6 +140,30 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_DIR = "/media/"
 
+# Attachment uploads are streamed to temporary files chunk by chunk and
+# hashed on the way in; requests over the limits are cut off before they
+# are read. Only the attachment views use these limits (see
+# complaints.uploads.attachment_uploads).
+ATTACHMENT_MAX_FILE_SIZE = 5 * 1024 * 1024
+ATTACHMENT_MAX_REQUEST_SIZE = 30 * 1024 * 1024
+
+# Attachments are stored privately by content hash and served by an
+# authorization-checked view. Behind Apache (mod_xsendfile) set the header
+# to "X-Sendfile"; behind nginx set it to "X-Accel-Redirect" and map
+# ATTACHMENT_ACCEL_PREFIX to ATTACHMENT_ROOT in an internal location.
+ATTACHMENT_ROOT = os.path.join(BASE_DIR, "private_media", "attachments")
+ATTACHMENT_SENDFILE_HEADER = None
+ATTACHMENT_ACCEL_PREFIX = "/protected/attachments/"
+
+# Cached template fragments and lookups are invalidated by bumping version
+# keys, so every process must share the cache once there is more than one
+# worker (e.g. FileBasedCache or Redis).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 AUTH_USER_MODEL = "complaints.User"
 AUTH_GROUP_MODEL = "complaints.UserType"
 
@@ -0,0 +1,7 @@
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+ALLOWED_HOSTS = [
+    "*",
+]
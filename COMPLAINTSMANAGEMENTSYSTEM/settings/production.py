@@ -0,0 +1,61 @@
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, CACHES, DATABASES, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.environ.get("ALLOWED_HOSTS", "").split(",") if host]
+
+# Keep database connections open between requests, and check a reused one
+# is still alive before handing it to a request.
+DATABASES = {
+    **DATABASES,
+    "default": {
+        **DATABASES["default"],
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    },
+}
+
+# Parse each template once per process. Explicit loaders require
+# APP_DIRS off; wsgi.py compiles every project template at worker boot
+# (see complaints/warmup.py), so no request pays for parsing.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            **TEMPLATES[0]["OPTIONS"],
+            "context_processors": [
+                processor
+                for processor in TEMPLATES[0]["OPTIONS"]["context_processors"]
+                if processor != "django.template.context_processors.debug"
+            ],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
+        },
+    },
+]
+
+WARM_TEMPLATES_AT_BOOT = True
+
+# Timings stay on the staff metrics page rather than in every response.
+SERVER_TIMING_HEADER = False
+
+# Shared by all workers on the host, so fragment version bumps reach
+# every process.
+CACHES = {
+    **CACHES,
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_LOCATION", os.path.join(BASE_DIR, "cache")),
+    },
+}
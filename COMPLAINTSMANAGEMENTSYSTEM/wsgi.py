@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'COMPLAINTSMANAGEMENTSYSTEM.settings')
 
 application = get_wsgi_application()
+
+if settings.WARM_TEMPLATES_AT_BOOT:
+    # Compile every template before the first request. With a preloading
+    # server (gunicorn --preload) this happens once and workers share it.
+    from complaints.warmup import warm_templates
+
+    warm_templates()
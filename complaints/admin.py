@@ -6,6 +6,10 @@ from .models import (
     Department,
     Remark,
     DepartmentHistory,
+    DepartmentComplaintStats,
+    Attachment,
+    ImageRendition,
+    Job,
 )
 
 
@@ -45,6 +49,10 @@ admin.site.register(Department)
 admin.site.register(Complaint)
 admin.site.register(Remark)
 admin.site.register(DepartmentHistory)
+admin.site.register(DepartmentComplaintStats)
+admin.site.register(Attachment)
+admin.site.register(Job)
+admin.site.register(ImageRendition)
 
 
 admin.site.site_header = "CMS admin area"
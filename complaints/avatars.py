@@ -0,0 +1,68 @@
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Square JPEG variants made when a profile picture is uploaded. Pages ask
+# for a display size and get the smallest variant at least that large.
+AVATAR_SIZES = (48, 128, 320)
+AVATAR_QUALITY = 85
+DEFAULT_AVATAR = "default_pic.jpg"
+
+
+def avatar_name(version, size):
+    # The version is a content hash, so a new picture gets new URLs and the
+    # old ones can be cached forever.
+    return f"avatars/{version[:2]}/{version}-{size}.jpg"
+
+
+def generate_avatars(picture, storage=default_storage):
+    """
+    Write the avatar variants of ``picture`` (an open image file) and
+    return their version, or "" when it isn't a readable image.
+    """
+    sha256 = hashlib.sha256()
+    for chunk in picture.chunks():
+        sha256.update(chunk)
+    picture.seek(0)
+    version = sha256.hexdigest()[:16]
+
+    if all(storage.exists(avatar_name(version, size)) for size in AVATAR_SIZES):
+        return version
+    try:
+        image = ImageOps.exif_transpose(Image.open(picture))
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        return ""
+    finally:
+        picture.seek(0)
+    image = image.convert("RGB")
+
+    for size in AVATAR_SIZES:
+        name = avatar_name(version, size)
+        if storage.exists(name):
+            continue
+        buffer = io.BytesIO()
+        ImageOps.fit(image, (size, size), Image.LANCZOS).save(
+            buffer, "JPEG", quality=AVATAR_QUALITY, optimize=True
+        )
+        storage.save(name, ContentFile(buffer.getvalue()))
+    return version
+
+
+def avatar_size(size):
+    for variant in AVATAR_SIZES:
+        if variant >= size:
+            return variant
+    return AVATAR_SIZES[-1]
+
+
+def avatar_url(user, size, storage=default_storage):
+    if user.avatar_version:
+        return storage.url(avatar_name(user.avatar_version, avatar_size(size)))
+    if user.profile_picture:
+        return user.profile_picture.url
+    return static(DEFAULT_AVATAR)
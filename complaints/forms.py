@@ -4,12 +4,13 @@ from django.contrib.auth.forms import (
     AuthenticationForm,
     PasswordChangeForm,
 )
-from multiupload.fields import MultiMediaField
+from multiupload.fields import MultiMediaField, MultiUploadMetaInput
 
 # from multiupload.widgets import MultiFileInput
 from .models import Remark, User, Department, Complaint
 from django.contrib.auth.models import Group
-from mtaa import tanzania, districts
+from django.urls import reverse
+from . import regions
 
 
 class DepartmentForm(forms.ModelForm):
@@ -151,16 +152,18 @@ class UserProfileForm(forms.ModelForm):
         widget=forms.ClearableFileInput(attrs={"class": "form-control"})
     )
 
-    region = forms.CharField(
+    region = forms.ChoiceField(
         label="Region",
         required=False,
-        widget=forms.TextInput(attrs={"class": "form-control"}),
+        choices=lambda: (("", "---------"),) + regions.region_choices(),
+        widget=forms.Select(attrs={"class": "form-control"}),
     )
 
-    district = forms.CharField(
+    district = forms.ChoiceField(
         label="District",
         required=False,
-        widget=forms.TextInput(attrs={"class": "form-control"}),
+        choices=lambda: (("", "---------"),) + regions.district_choices(),
+        widget=forms.Select(attrs={"class": "form-control"}),
     )
 
     phone_number = forms.CharField(
@@ -223,7 +226,53 @@ class MultiFileField(forms.FileField):
         super().__init__(*args, **kwargs)
 
 
-class AddComplaintForm(forms.ModelForm):
+# Personnel select -> department select it depends on.
+DEPARTMENT_PERSONNEL_FIELDS = {
+    "targeted_personnel": "targeted_department",
+    "remark_targeted_personnel": "remark_targeted_department",
+}
+
+
+class DepartmentPersonnelMixin:
+    """
+    Offer only members of the selected department in the personnel selects.
+
+    The department select reloads its personnel select over htmx when it
+    changes, so a rendered dialog never lists the whole user table.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for personnel_field, department_field in DEPARTMENT_PERSONNEL_FIELDS.items():
+            if personnel_field not in self.fields or department_field not in self.fields:
+                continue
+            department_id = self.selected_department(department_field)
+            self.fields[personnel_field].queryset = (
+                User.objects.filter(departments_id=department_id, is_active=True).order_by("username")
+                if department_id
+                else User.objects.none()
+            )
+            self.fields[department_field].widget.attrs.update(
+                {
+                    "hx-get": f"{reverse('complaints:department_members')}?field={personnel_field}",
+                    "hx-target": f"#{self[personnel_field].auto_id}",
+                    "hx-swap": "outerHTML",
+                }
+            )
+
+    def selected_department(self, field):
+        if self.is_bound:
+            value = self.data.get(self.add_prefix(field))
+        else:
+            value = self.get_initial_for_field(self.fields[field], field)
+        value = getattr(value, "pk", value)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class AddComplaintForm(DepartmentPersonnelMixin, forms.ModelForm):
     title = forms.CharField(
         label="title",
         widget=forms.TextInput(attrs={"class": "form-control"}),
@@ -239,7 +288,7 @@ class AddComplaintForm(forms.ModelForm):
         max_num=5,
         max_file_size=1024 * 1024 * 5,
         media_type="image",  # 'audio', 'video' or 'image'
-        widget=forms.ClearableFileInput(attrs={"class": "form-control"}),
+        widget=MultiUploadMetaInput(attrs={"class": "form-control"}),
         required=False,
     )
 
@@ -292,7 +341,7 @@ class UpdateComplaintForm(forms.ModelForm):
         ]
 
 
-class AddRemarkForm(forms.ModelForm):
+class AddRemarkForm(DepartmentPersonnelMixin, forms.ModelForm):
     complaint = forms.ModelChoiceField(
         queryset=Complaint.objects.all(),
         required=True,
@@ -308,7 +357,7 @@ class AddRemarkForm(forms.ModelForm):
         max_num=5,
         max_file_size=1024 * 1024 * 5,
         media_type="image",  # 'audio', 'video' or 'image'
-        widget=forms.ClearableFileInput(attrs={"class": "form-control"}),
+        widget=MultiUploadMetaInput(attrs={"class": "form-control"}),
         required = False,
     )
 
@@ -348,8 +397,62 @@ class AddRemarkForm(forms.ModelForm):
             "status",
         ]
 
+    def __init__(self, *args, **kwargs):
+        initial = kwargs.get("initial") or {}
+        complaint = initial.get("complaint")
+        if complaint is not None:
+            # Forward within the complaint's current department by default.
+            kwargs["initial"] = {
+                "remark_targeted_department": complaint.targeted_department_id,
+                **initial,
+            }
+        super().__init__(*args, **kwargs)
+        if complaint is not None:
+            self.fields["complaint"].queryset = Complaint.objects.filter(pk=complaint.pk)
+
+
+class BulkTransitionForm(DepartmentPersonnelMixin, forms.Form):
+    STATUS_CHOICES = AddRemarkForm.STATUS_CHOICES
+
+    complaints = forms.ModelMultipleChoiceField(
+        queryset=Complaint.objects.only("pk"),
+        widget=forms.MultipleHiddenInput,
+    )
+
+    status = forms.ChoiceField(
+        choices=STATUS_CHOICES,
+        label="status",
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+
+    content = forms.CharField(
+        label="description", widget=forms.Textarea(attrs={"class": "form-control", "rows": 2})
+    )
+
+    remark_targeted_department = forms.ModelChoiceField(
+        queryset=Department.objects.all(),
+        required=False,
+        label="Department",
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+
+    remark_targeted_personnel = forms.ModelChoiceField(
+        queryset=User.objects.all(),
+        label="Forward / respond to",
+        required=False,
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("status") == "Forwarded":
+            for field in ("remark_targeted_department", "remark_targeted_personnel"):
+                if not cleaned_data.get(field):
+                    self.add_error(field, "Required when forwarding complaints.")
+        return cleaned_data
+
 
-class UpdateRemarkForm(forms.ModelForm):
+class UpdateRemarkForm(DepartmentPersonnelMixin, forms.ModelForm):
     content = forms.CharField(
         label="description", widget=forms.Textarea(attrs={"class": "form-control"})
     )
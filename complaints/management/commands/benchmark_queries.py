@@ -0,0 +1,187 @@
+import random
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from complaints.models import Complaint, Department, Remark, User
+from complaints.roles import CEO, EMPLOYEE, HOD
+from complaints.views import (
+    AllComplaintsDisplayView,
+    AllUserDisplayView,
+    UserComplaintsDisplayView,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN plans and timings for the queries behind the complaint "
+        "and user list views, optionally seeding a large dataset first. "
+        "Run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Number of complaints to generate before benchmarking.",
+        )
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Also report every query with the access path indexes dropped. "
+            "The indexes are recreated afterwards.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per query; the best time is reported.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self.seed(options["seed"])
+
+        cases = self.view_queries()
+        if options["compare"]:
+            with self.without_indexes():
+                self.report("before (no access path indexes)", cases, options["repeat"])
+        self.report("after (access path indexes)", cases, options["repeat"])
+
+    def seed(self, count):
+        rng = random.Random(0)
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in (CEO, HOD, EMPLOYEE)}
+
+        with transaction.atomic():
+            departments = Department.objects.bulk_create(
+                Department(name=f"bench-department-{i}", description="benchmark")
+                for i in range(max(count // 5000, 5))
+            )
+            users = User.objects.bulk_create(
+                User(
+                    username=f"bench-user-{i}",
+                    password="!",
+                    departments=departments[i % len(departments)],
+                )
+                for i in range(max(count // 20, 50))
+            )
+            memberships = [User.groups.through(user_id=users[0].pk, group_id=groups[CEO].pk)]
+            memberships += [
+                User.groups.through(user_id=user.pk, group_id=groups[HOD].pk)
+                for user in users[1 : len(departments) + 1]
+            ]
+            memberships += [
+                User.groups.through(user_id=user.pk, group_id=groups[EMPLOYEE].pk)
+                for user in users[len(departments) + 1 :]
+            ]
+            User.groups.through.objects.bulk_create(memberships)
+
+        statuses = ["Opened", "Forwarded", "Closed"]
+        batch_size = 5000
+        for start in range(0, count, batch_size):
+            complaints = [
+                Complaint(
+                    title=f"bench complaint {i}",
+                    description="benchmark complaint description",
+                    complainant=rng.choice(users),
+                    targeted_department=rng.choice(departments),
+                    targeted_personnel=rng.choice(users),
+                    status=rng.choice(statuses),
+                )
+                for i in range(start, min(start + batch_size, count))
+            ]
+            for complaint in complaints:
+                complaint.search_document = complaint.build_search_document()
+            with transaction.atomic():
+                complaints = Complaint.objects.bulk_create(complaints)
+                Remark.objects.bulk_create(
+                    Remark(
+                        complaint=complaint,
+                        respondent=rng.choice(users),
+                        content="benchmark remark",
+                        status="Forwarded",
+                        remark_targeted_personnel=rng.choice(users),
+                        remark_targeted_department=rng.choice(departments),
+                    )
+                    for complaint in complaints
+                    if rng.random() < 0.5
+                )
+            self.stdout.write(f"seeded {min(start + batch_size, count)} / {count} complaints")
+
+    def view_queries(self):
+        users = {
+            name: User.objects.filter(groups__name=name).order_by("pk").first()
+            for name in (CEO, HOD, EMPLOYEE)
+        }
+        missing = [name for name, user in users.items() if user is None]
+        if missing:
+            raise CommandError(
+                f"No user in group(s) {', '.join(missing)}; use --seed to create some."
+            )
+
+        cases = [
+            ("all complaints (CEO)", AllComplaintsDisplayView, users[CEO], {}),
+            ("all complaints (HOD)", AllComplaintsDisplayView, users[HOD], {}),
+            (
+                "all complaints search (CEO)",
+                AllComplaintsDisplayView,
+                users[CEO],
+                {"search_query": "bench"},
+            ),
+            ("my complaints", UserComplaintsDisplayView, users[EMPLOYEE], {}),
+            ("all users (CEO)", AllUserDisplayView, users[CEO], {}),
+            ("all users (HOD)", AllUserDisplayView, users[HOD], {}),
+        ]
+        queries = []
+        for label, view_class, user, params in cases:
+            request = RequestFactory().get("/", params)
+            request.user = user
+            view = view_class()
+            view.setup(request)
+            queryset = view.get_queryset().order_by(*view.get_keyset())[: view.paginate_by + 1]
+            queries.append((label, queryset))
+
+        complaint = Complaint.objects.order_by("-pk").first()
+        if complaint is not None:
+            queries.append(
+                (
+                    "complaint visibility remark lookup",
+                    Remark.objects.filter(
+                        complaint=complaint, remark_targeted_personnel=users[EMPLOYEE]
+                    ),
+                )
+            )
+        return queries
+
+    def report(self, title, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {title} =="))
+        for label, queryset in queries:
+            best = None
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                list(queryset.all())
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(self.style.SUCCESS(f"{label}: {best * 1000:.2f} ms"))
+            self.stdout.write(queryset.explain())
+            self.stdout.write("")
+
+    @contextmanager
+    def without_indexes(self):
+        indexes = [
+            (model, index) for model in (Complaint, Remark) for index in model._meta.indexes
+        ]
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        try:
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
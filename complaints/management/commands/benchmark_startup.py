@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SETUP = "import django; django.setup(); "
+
+# (label, untimed setup, timed code)
+CASES = [
+    (
+        "worker boot (django.setup + URLconf)",
+        "",
+        SETUP + "import importlib; importlib.import_module(settings.ROOT_URLCONF)",
+    ),
+    ("eager mtaa import (previous behaviour)", "", "import mtaa"),
+    (
+        "first region lookup (complaints.regions)",
+        SETUP + "from complaints import regions",
+        "regions.district_choices()",
+    ),
+    (
+        "cached region lookup (complaints.regions)",
+        SETUP + "from complaints import regions; regions.district_choices()",
+        "regions.district_choices()",
+    ),
+]
+
+PROBE = """
+import json, sys, time
+from django.conf import settings
+{setup}
+started = time.perf_counter()
+{code}
+print(json.dumps({{"seconds": time.perf_counter() - started, "mtaa": "mtaa" in sys.modules}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time worker start-up and the region/district lookups in fresh "
+        "interpreters, and report whether mtaa gets imported at boot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Fresh interpreters per case; best time wins."
+        )
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get(
+            "DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE
+        )}
+        for label, setup, code in CASES:
+            best = None
+            for _ in range(max(options["repeat"], 1)):
+                output = subprocess.run(
+                    [sys.executable, "-c", PROBE.format(setup=setup, code=code)],
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                if best is None or result["seconds"] < best["seconds"]:
+                    best = result
+            loaded = "mtaa loaded" if best["mtaa"] else "mtaa not loaded"
+            self.stdout.write(f"{label}: {best['seconds'] * 1000:.1f} ms ({loaded})")
@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import Client, override_settings
+
+from complaints.models import User
+from complaints.warmup import warm_templates
+
+URLS = ["/home/", "/all-complaints/", "/all-users/", "/user-complaints/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time page requests with every template parsed again per request (no "
+        "template cache) and then served from the warmed cached loader."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="*", default=URLS, help="Pages to request.")
+        parser.add_argument(
+            "--user", help="Username to request the pages as; defaults to a superuser."
+        )
+        parser.add_argument(
+            "--requests", type=int, default=20, help="Requests per page and mode; the median wins."
+        )
+
+    def handle(self, *args, **options):
+        cached_loaders = [
+            loader
+            for loader in engines["django"].engine.template_loaders
+            if hasattr(loader, "reset")
+        ]
+        if not cached_loaders:
+            raise CommandError("The template engine has no cached loader to compare against.")
+
+        users = User.objects.filter(username=options["user"]) if options["user"] else (
+            User.objects.filter(is_superuser=True)
+        )
+        user = users.order_by("pk").first()
+        if user is None:
+            raise CommandError("No user to request the pages as.")
+        client = Client()
+        client.force_login(user)
+
+        def median_ms(url, parse_each_time):
+            timings = []
+            for _ in range(max(options["requests"], 1)):
+                if parse_each_time:
+                    for loader in cached_loaders:
+                        loader.reset()
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                self.stderr.write(f"{url} answered {response.status_code}")
+            return statistics.median(timings) * 1000
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for url in options["urls"]:
+                before = median_ms(url, parse_each_time=True)
+                warm_templates()
+                after = median_ms(url, parse_each_time=False)
+                self.stdout.write(
+                    f"{url}: {before:.1f} ms parsing per request, "
+                    f"{after:.1f} ms cached ({before - after:.1f} ms saved)"
+                )
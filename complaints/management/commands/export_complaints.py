@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.models import User
+from complaints.services import export, listing
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream complaints with their remarks and department history as CSV "
+        "or JSONL. Memory use does not grow with the number of complaints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(export.CONTENT_TYPES), default="csv")
+        parser.add_argument(
+            "--user",
+            help="Export only what this username sees on the all complaints page. "
+            "Defaults to every complaint.",
+        )
+        parser.add_argument("--search", help="Full-text search query to filter by.")
+        parser.add_argument("--output", help="File to write to. Defaults to stdout.")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']!r}.")
+        else:
+            user = User(is_superuser=True)
+
+        queryset = listing.scoped_complaints(user, options["search"])
+        chunks = export.export_complaints(queryset, options["format"], options["chunk_size"])
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from complaints import avatars
+from complaints.models import User
+
+
+class Command(BaseCommand):
+    help = "Create avatar variants for profile pictures uploaded before they existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Regenerate for every user, not just missing ones."
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture="").exclude(profile_picture=None)
+        if not options["all"]:
+            users = users.filter(avatar_version="")
+        versions = {}
+        done = skipped = 0
+        for user in users.only("pk", "profile_picture").iterator():
+            name = user.profile_picture.name
+            if name not in versions:
+                try:
+                    with user.profile_picture.open() as picture:
+                        versions[name] = avatars.generate_avatars(picture)
+                except FileNotFoundError:
+                    versions[name] = ""
+            if not versions[name]:
+                skipped += 1
+                continue
+            User.objects.filter(pk=user.pk).update(avatar_version=versions[name])
+            done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Avatars ready for {done} users ({skipped} unreadable pictures).")
+        )
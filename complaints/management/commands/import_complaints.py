@@ -0,0 +1,64 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.services import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import complaints from a CSV or JSONL file. Departments and users are "
+        "matched by name and username; rows that cannot be resolved are "
+        "rejected and reported instead of aborting the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format. Defaults to the file extension.",
+        )
+        parser.add_argument("--batch-size", type=int, default=importer.BATCH_SIZE)
+        parser.add_argument("--rejects", help="Write rejected rows to this JSONL file.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        rejects = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+
+        def on_reject(number, error, record):
+            self.stderr.write(f"line {number}: {error}")
+            if rejects:
+                record = record if isinstance(record, dict) else None
+                rejects.write(json.dumps({"line": number, "error": error, "record": record}) + "\n")
+
+        def on_batch(imported, rejected, elapsed):
+            self.stdout.write(
+                f"imported {imported} ({imported / elapsed:.0f} rows/sec), rejected {rejected}"
+            )
+
+        try:
+            stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as error:
+            raise CommandError(error)
+
+        try:
+            imported, rejected = importer.import_complaints(
+                importer.read_records(stream, format),
+                batch_size=options["batch_size"],
+                on_reject=on_reject,
+                on_batch=on_batch,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects:
+                rejects.close()
+
+        style = self.style.SUCCESS if not rejected else self.style.WARNING
+        self.stdout.write(style(f"Imported {imported} complaints, rejected {rejected}."))
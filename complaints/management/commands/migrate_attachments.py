@@ -0,0 +1,44 @@
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints.models import Complaint, Remark
+from complaints.services import attachments
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files from the old per-row attachments fields into content-addressed "
+        "Attachment storage, so they are served through the authorization check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Delete the old files from MEDIA_ROOT once moved.",
+        )
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        for model, owner in ((Complaint, "complainant"), (Remark, "respondent")):
+            for obj in model.objects.exclude(attachments="").exclude(attachments=None).iterator():
+                name = obj.attachments.name
+                if not default_storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"{model.__name__} {obj.pk}: {name} is missing")
+                    continue
+                with default_storage.open(name) as source, transaction.atomic():
+                    attachments.attach(
+                        obj, [File(source, name=os.path.basename(name))], getattr(obj, owner)
+                    )
+                    model.objects.filter(pk=obj.pk).update(attachments="")
+                if options["delete"]:
+                    default_storage.delete(name)
+                moved += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Moved {moved} attachments ({missing} missing files skipped).")
+        )
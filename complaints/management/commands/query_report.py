@@ -0,0 +1,72 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.services import querylog
+
+
+def describe(origin):
+    if not origin:
+        return "unknown origin"
+    where = f"{origin['file']}:{origin['line']} in {origin['function']}"
+    if origin.get("template"):
+        where += f" (rendering {origin['template']})"
+    return where
+
+
+class Command(BaseCommand):
+    help = "Summarise the slow, duplicate and repeated queries in the query log."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Log to read; defaults to QUERY_LOG_PATH.")
+        parser.add_argument(
+            "--kind",
+            choices=[querylog.SLOW, querylog.DUPLICATE, querylog.REPEATED],
+            help="Only report this kind of event.",
+        )
+        parser.add_argument("--view", help="Only report events from this view name.")
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Number of query shapes to show."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.QUERY_LOG_PATH
+        if not path:
+            raise CommandError("Pass a log path or set QUERY_LOG_PATH.")
+        try:
+            events = list(querylog.read(path))
+        except FileNotFoundError:
+            raise CommandError(f"No query log at {path}.")
+
+        groups = defaultdict(list)
+        for event in events:
+            if options["kind"] and event["kind"] != options["kind"]:
+                continue
+            if options["view"] and event["view"] != options["view"]:
+                continue
+            groups[(event["kind"], event["fingerprint"])].append(event)
+        if not groups:
+            self.stdout.write("Nothing logged.")
+            return
+
+        ranked = sorted(
+            groups.items(),
+            key=lambda item: (len(item[1]), sum(e["duration_ms"] for e in item[1])),
+            reverse=True,
+        )
+        for (kind, fingerprint), group in ranked[: options["limit"]]:
+            durations = [event["duration_ms"] for event in group]
+            views = Counter(event["view"] for event in group)
+            [(origin, _)] = Counter(describe(event["origin"]) for event in group).most_common(1)
+            self.stdout.write(
+                self.style.WARNING(f"{kind} {fingerprint}")
+                + f": {len(group)} times, {sum(durations):.1f} ms in total, "
+                f"{max(durations):.1f} ms at worst"
+            )
+            self.stdout.write(f"  from {origin}")
+            self.stdout.write(
+                "  views: " + ", ".join(f"{view} ({count})" for view, count in views.most_common())
+            )
+            self.stdout.write(f"  {group[0]['sql'][:300]}")
+        self.stdout.write(f"{len(groups)} query shapes, {sum(map(len, groups.values()))} events.")
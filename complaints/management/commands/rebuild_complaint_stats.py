@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import DepartmentComplaintStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-department complaint counters from the complaints "
+        "table. Only needed after writes that bypassed the ORM."
+    )
+
+    def handle(self, *args, **options):
+        count = DepartmentComplaintStats.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt complaint stats for {count} departments."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.models import Job
+from complaints.services import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (attachment processing and the like). "
+        "Keeps polling the queue unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per poll.")
+        parser.add_argument(
+            "--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            ran = jobs.run_pending(options["batch"])
+            for job in ran:
+                style = self.style.SUCCESS if job.status == Job.DONE else self.style.ERROR
+                self.stdout.write(style(f"{job.pk} {job.task}: {job.status}"))
+            if not ran:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
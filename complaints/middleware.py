@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .services import metrics, querylog
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request, count its queries and their time, add the template
+    render time and response size, and keep them per view for the staff
+    metrics page. Work done while a streaming response is consumed happens
+    after this returns and is not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = metrics.RequestCollector()
+        token = metrics.current.set(collector)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(collector.execute):
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        wall_time = time.perf_counter() - started
+
+        match = request.resolver_match
+        size = None if response.streaming else len(response.content)
+        metrics.record(match.view_name if match else "<unresolved>", wall_time, collector, size)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = collector.server_timing(wall_time)
+        return response
+
+
+class QueryLogMiddleware:
+    """
+    Append slow, duplicate and repeated queries, with the project code that
+    ran them, to QUERY_LOG_PATH. Off unless that setting is set; summarise
+    the log with ``manage.py query_report``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_LOG_PATH:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = querylog.RequestQueries()
+        with connection.execute_wrapper(queries.execute):
+            response = self.get_response(request)
+        querylog.write(request, queries.events)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_remove_complaint_attachments_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-date_added', '-id'], name='complaint_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['targeted_department', '-date_added', '-id'], name='complaint_dept_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['complainant', '-date_added', '-id'], name='complaint_owner_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['targeted_personnel', 'status'], name='complaint_personnel_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='remark',
+            index=models.Index(fields=['remark_targeted_personnel', 'complaint'], name='remark_personnel_complaint_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='remark',
+            index=models.Index(fields=['remark_targeted_department', 'complaint'], name='remark_dept_complaint_idx'),
+        ),
+    ]
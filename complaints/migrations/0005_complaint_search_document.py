@@ -0,0 +1,58 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+def populate_search_document(apps, schema_editor):
+    Complaint = apps.get_model("complaints", "Complaint")
+    complaints = Complaint.objects.using(schema_editor.connection.alias).select_related(
+        "complainant", "targeted_department", "targeted_personnel"
+    )
+    batch = []
+    for complaint in complaints.iterator(chunk_size=1000):
+        complaint.search_document = "\n".join(
+            [
+                complaint.title,
+                complaint.description,
+                complaint.complainant.username,
+                complaint.targeted_department.name,
+                complaint.targeted_personnel.username,
+            ]
+        )
+        batch.append(complaint)
+        if len(batch) == 1000:
+            Complaint.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    Complaint.objects.bulk_update(batch, ["search_document"])
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            "ALTER TABLE complaints_complaint "
+            "ADD FULLTEXT INDEX complaint_search_ft (search_document)"
+        )
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            "ALTER TABLE complaints_complaint DROP INDEX complaint_search_ft"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_complaint_complaint_added_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_document, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
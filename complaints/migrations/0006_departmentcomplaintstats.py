@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_stats(apps, schema_editor):
+    Complaint = apps.get_model("complaints", "Complaint")
+    DepartmentComplaintStats = apps.get_model("complaints", "DepartmentComplaintStats")
+    alias = schema_editor.connection.alias
+    stats = {}
+    rows = (
+        Complaint.objects.using(alias)
+        .order_by()
+        .values("targeted_department", "status")
+        .annotate(total=models.Count("id"))
+    )
+    for row in rows:
+        department_id = row["targeted_department"]
+        stat = stats.setdefault(
+            department_id, DepartmentComplaintStats(department_id=department_id)
+        )
+        setattr(stat, row["status"].lower(), row["total"])
+    DepartmentComplaintStats.objects.using(alias).bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_complaint_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentComplaintStats',
+            fields=[
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='complaint_stats', serialize=False, to='complaints.department')),
+                ('opened', models.IntegerField(default=0)),
+                ('forwarded', models.IntegerField(default=0)),
+                ('closed', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
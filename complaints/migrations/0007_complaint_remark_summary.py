@@ -0,0 +1,52 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+
+def populate_remark_summary(apps, schema_editor):
+    Complaint = apps.get_model("complaints", "Complaint")
+    Remark = apps.get_model("complaints", "Remark")
+    alias = schema_editor.connection.alias
+    remarks = Remark.objects.using(alias).filter(complaint=models.OuterRef("pk"))
+    latest = remarks.order_by("-date", "-id")
+    Complaint.objects.using(alias).update(
+        latest_remark=models.Subquery(latest.values("pk")[:1]),
+        latest_remark_at=models.Subquery(latest.values("date")[:1]),
+        remark_count=Coalesce(
+            models.Subquery(
+                remarks.order_by()
+                .values("complaint")
+                .annotate(total=models.Count("id"))
+                .values("total")
+            ),
+            models.Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_departmentcomplaintstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='latest_remark',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='complaints.remark'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='latest_remark_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='remark_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_remark_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:33
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+import complaints.storage
+
+
+def move_to_content_addressed_storage(apps, schema_editor):
+    # Files attached so far sit in MEDIA_ROOT under their upload names.
+    # Copy them to their hashed names and let the worker redo the
+    # renditions, which were also written to MEDIA_ROOT.
+    Attachment = apps.get_model("complaints", "Attachment")
+    ImageRendition = apps.get_model("complaints", "ImageRendition")
+    Job = apps.get_model("complaints", "Job")
+    alias = schema_editor.connection.alias
+    storage = complaints.storage.attachment_storage
+
+    moved = {}
+    for attachment in Attachment.objects.using(alias).order_by("pk"):
+        old = attachment.file.name
+        if old not in moved:
+            moved[old] = storage.hashed_name(attachment.sha256, old)
+            if default_storage.exists(old):
+                with default_storage.open(old) as source:
+                    storage.save(moved[old], source)
+                Job.objects.using(alias).create(
+                    task="complaints.services.images.process_image",
+                    payload={"name": moved[old]},
+                )
+        Attachment.objects.using(alias).filter(pk=attachment.pk).update(file=moved[old])
+    ImageRendition.objects.using(alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_attachment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(max_length=255, storage=complaints.storage.get_attachment_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='imagerendition',
+            name='thumbnail',
+            field=models.ImageField(max_length=255, storage=complaints.storage.get_attachment_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='imagerendition',
+            name='webp',
+            field=models.ImageField(max_length=255, storage=complaints.storage.get_attachment_storage, upload_to=''),
+        ),
+        migrations.RunPython(move_to_content_addressed_storage, migrations.RunPython.noop),
+    ]
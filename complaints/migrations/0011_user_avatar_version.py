@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_content_addressed_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_version',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_user_avatar_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaint',
+            name='date_added',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:13
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaint_date_added_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('latest_remark_at', 'date_added'), descending=True), models.OrderBy(models.F('id'), descending=True), name='complaint_activity_idx'),
+        ),
+    ]
@@ -1,11 +1,71 @@
 from django.utils import timezone
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
-from mtaa import districts
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 
+from . import avatars, regions, roles
+from .storage import get_attachment_storage
 
-class Department(models.Model):
+
+class TrackedFieldsMixin:
+    """
+    Remembers the column values an instance was loaded with so save() can
+    tell what changed without reading the row again.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        # Only the reloaded columns are known to match the database; other
+        # edits (e.g. made before a deferred field was loaded) stay dirty.
+        self.snapshot_fields(fields)
+
+    def save_base(self, *args, update_fields=None, **kwargs):
+        # post_save receivers still see what changed; afterwards it is clean.
+        super().save_base(*args, update_fields=update_fields, **kwargs)
+        self.snapshot_fields(update_fields)
+
+    def snapshot_fields(self, fields=None):
+        if fields is None:
+            self._loaded_values = {
+                field.attname: self.__dict__[field.attname]
+                for field in self._meta.concrete_fields
+                if field.attname in self.__dict__
+            }
+            return
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return
+        for name in fields:
+            try:
+                field = self._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+
+    def changed_fields(self):
+        # None means unknown: the instance was not loaded from the database.
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return None
+        return {
+            name
+            for name, value in loaded.items()
+            if self.__dict__.get(name, value) != value
+        }
+
+
+class Department(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
 
@@ -20,7 +80,7 @@ STATUS_CHOICES = (
 )
 
 
-class User(AbstractUser):
+class User(TrackedFieldsMixin, AbstractUser):
     departments = models.ForeignKey(Department, on_delete=models.DO_NOTHING, related_name="user_department", null=True)
     profile_picture = models.ImageField(
         upload_to="profile_pictures/", default="default_pic.jpg", blank=True, null=True
@@ -30,15 +90,78 @@ class User(AbstractUser):
     district = models.CharField(
         max_length=100, blank=True
     )
+    # Content hash of profile_picture naming its avatar variants; see avatars.py.
+    avatar_version = models.CharField(max_length=16, blank=True, default="", editable=False)
+
+    def clean(self):
+        super().clean()
+        errors = {}
+        if self.region and not regions.is_region(self.region):
+            errors["region"] = "Unknown region."
+        if self.district:
+            if not regions.is_district(self.district):
+                errors["district"] = "Unknown district."
+            elif self.region and "region" not in errors and not regions.is_district(
+                self.district, self.region
+            ):
+                errors["district"] = f"{self.district} is not in {self.region}."
+        if errors:
+            raise ValidationError(errors)
 
     def save(self, *args, **kwargs):
+        picture = self.profile_picture
+        if not picture:
+            self.avatar_version = ""
+        elif not picture._committed:
+            # A fresh upload: make the avatar variants while it is at hand.
+            self.avatar_version = avatars.generate_avatars(picture)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "profile_picture" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "avatar_version"}
         super(User, self).save(*args, **kwargs)
 
     def __str__(self):
         return self.username
 
 
-class Complaint(models.Model):
+class ComplaintQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related(
+            "complainant", "targeted_department", "targeted_personnel"
+        )
+
+    def with_last_activity(self):
+        return self.annotate(last_activity=Coalesce("latest_remark_at", "date_added"))
+
+    def refresh_remark_summary(self, **changes):
+        # One UPDATE recomputing the remark columns from the Remark table.
+        return self.update(**remark_summary(), **changes)
+
+    def involving(self, user):
+        """Complaints ``user`` filed, was assigned, or was sent or wrote a remark on."""
+        return self.filter(involvement(user))
+
+    def visible_to(self, user):
+        """
+        Complaints ``user`` may see, as one WHERE clause. Besides their own
+        (see involving()), HODs see everything sent to their department and
+        the CEO and superusers see all complaints.
+        """
+        if not user.is_authenticated:
+            return self.none()
+        if roles.sees_all_complaints(user):
+            return self.all()
+        condition = involvement(user)
+        if roles.is_hod(user) and user.departments_id:
+            condition |= Q(targeted_department_id=user.departments_id) | Exists(
+                Remark.objects.filter(
+                    complaint=OuterRef("pk"), remark_targeted_department_id=user.departments_id
+                )
+            )
+        return self.filter(condition)
+
+
+class Complaint(TrackedFieldsMixin, models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     complainant = models.ForeignKey(User, on_delete=models.CASCADE, blank=True)
@@ -48,30 +171,168 @@ class Complaint(models.Model):
         User, on_delete=models.CASCADE, related_name="complaints_targeted"
     )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Opened")
-    date_added = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so imports can keep legacy dates.
+    date_added = models.DateTimeField(default=timezone.now, editable=False)
     date_modified = models.DateTimeField(auto_now=True)
 
     department_history = models.ManyToManyField(Department, through='DepartmentHistory', related_name="history", blank=True)
 
+    search_document = models.TextField(blank=True, default="", editable=False)
+
+    # Maintained by Remark.save and the remark post_delete receiver.
+    latest_remark = models.ForeignKey(
+        "Remark", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+"
+    )
+    latest_remark_at = models.DateTimeField(null=True, blank=True, editable=False)
+    remark_count = models.PositiveIntegerField(default=0, editable=False)
+
+    attachment_files = GenericRelation("Attachment")
+
+    objects = ComplaintQuerySet.as_manager()
+
+    REMARK_SUMMARY_FIELDS = ("latest_remark", "latest_remark_at", "remark_count")
+
+    SEARCH_DOCUMENT_FIELDS = (
+        "title",
+        "description",
+        "complainant",
+        "targeted_department",
+        "targeted_personnel",
+    )
+
     class Meta:
         ordering = ['-date_added']
+        indexes = [
+            models.Index(fields=["-date_added", "-id"], name="complaint_added_idx"),
+            # Matches with_last_activity() for the ?sort=activity keyset.
+            models.Index(
+                Coalesce("latest_remark_at", "date_added").desc(),
+                F("id").desc(),
+                name="complaint_activity_idx",
+            ),
+            models.Index(
+                fields=["targeted_department", "-date_added", "-id"],
+                name="complaint_dept_added_idx",
+            ),
+            models.Index(
+                fields=["complainant", "-date_added", "-id"],
+                name="complaint_owner_added_idx",
+            ),
+            models.Index(
+                fields=["targeted_personnel", "status"],
+                name="complaint_personnel_status_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
+        # Nothing changed since the instance was loaded or saved: no queries.
+        if not args and not kwargs and not self._state.adding and self.changed_fields() == set():
+            return
+        with transaction.atomic():
+            self._save(*args, **kwargs)
+
+    def _save(self, *args, **kwargs):
+        changed = self.changed_fields()
+        loaded = getattr(self, "_loaded_values", {})
+
+        previous = None
         if self.pk is not None:
-            original_complaint = Complaint.objects.get(pk=self.pk)
-            if self.status != original_complaint.status:
+            if changed is None or not {"status", "targeted_department_id"} <= loaded.keys():
+                previous = tuple(
+                    Complaint.objects.values_list("status", "targeted_department_id").get(
+                        pk=self.pk
+                    )
+                )
+            else:
+                previous = (loaded["status"], loaded["targeted_department_id"])
+            if self.status != previous[0]:
                 DepartmentHistory.objects.create(
                     complaint=self,
-                    department=self.targeted_department,
+                    department_id=self.targeted_department_id,
                     status=self.status
                 )
 
+        search_fields = {
+            self._meta.get_field(name).attname for name in self.SEARCH_DOCUMENT_FIELDS
+        }
+        if self._state.adding or changed is None or changed & search_fields:
+            self.search_document = self.build_search_document()
+            changed = None if changed is None else changed | {"search_document"}
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            if set(update_fields) & (set(self.SEARCH_DOCUMENT_FIELDS) | search_fields):
+                kwargs["update_fields"] = {*update_fields, "search_document"}
+        elif self.pk is not None and not args and not kwargs.get("force_insert"):
+            # Never write back the remark summary, it may be stale in memory.
+            summary = {
+                self._meta.get_field(name).attname for name in self.REMARK_SUMMARY_FIELDS
+            }
+            if changed is None:
+                changed = {field.attname for field in self._meta.concrete_fields if not field.primary_key}
+            kwargs["update_fields"] = (changed | {"date_modified"}) - summary
+
         super(Complaint, self).save(*args, **kwargs)
 
+        if previous != (self.status, self.targeted_department_id):
+            deltas = {(self.targeted_department_id, self.status): 1}
+            if previous is not None:
+                status, department_id = previous
+                deltas[(department_id, status)] = -1
+            DepartmentComplaintStats.objects.apply_deltas(deltas)
+
+    def build_search_document(self):
+        return "\n".join(
+            str(getattr(self, field)) for field in self.SEARCH_DOCUMENT_FIELDS
+        )
+
     def __str__(self):
         return f"{self.title},  by  {self.complainant}"
 
 
+def involvement(user):
+    remarks = Remark.objects.filter(complaint=OuterRef("pk"))
+    return (
+        Q(complainant=user)
+        | Q(targeted_personnel=user)
+        | Exists(remarks.filter(remark_targeted_personnel=user))
+        | Exists(remarks.filter(respondent=user))
+    )
+
+
+class RemarkQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related(
+            "respondent",
+            "respondent__departments",
+            "remark_targeted_personnel",
+            "remark_targeted_department",
+            "complaint__complainant__departments",
+            "complaint__targeted_personnel",
+        )
+
+    def visible_to(self, user):
+        """Remarks on complaints ``user`` may see."""
+        if user.is_authenticated and roles.sees_all_complaints(user):
+            return self.all()
+        return self.filter(complaint__in=Complaint.objects.visible_to(user).values("pk"))
+
+
+def remark_summary():
+    remarks = Remark.objects.filter(complaint=OuterRef("pk"))
+    latest = remarks.order_by("-date", "-id")
+    return {
+        "latest_remark": Subquery(latest.values("pk")[:1]),
+        "latest_remark_at": Subquery(latest.values("date")[:1]),
+        "remark_count": Coalesce(
+            Subquery(
+                remarks.order_by().values("complaint").annotate(total=Count("id")).values("total")
+            ),
+            Value(0),
+        ),
+    }
+
+
 class Remark(models.Model):
     respondent = models.ForeignKey(User, on_delete=models.CASCADE)
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name="remarks")
@@ -84,13 +345,41 @@ class Remark(models.Model):
     remark_targeted_department = models.ForeignKey(Department, on_delete=models.CASCADE, default=1)
     date = models.DateTimeField(auto_now_add=True)
 
+    attachment_files = GenericRelation("Attachment")
+
+    objects = RemarkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["remark_targeted_personnel", "complaint"],
+                name="remark_personnel_complaint_idx",
+            ),
+            models.Index(
+                fields=["remark_targeted_department", "complaint"],
+                name="remark_dept_complaint_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        if self.status == "Forwarded":
-            self.complaint.targeted_department = self.remark_targeted_department
+        adding = self._state.adding
+        if self.status in ("Forwarded", "Closed"):
+            if self.status == "Forwarded":
+                self.complaint.targeted_department = self.remark_targeted_department
             self.complaint.status = self.status
             self.complaint.save()
         super(Remark, self).save(*args, **kwargs)
 
+        complaints = Complaint.objects.filter(pk=self.complaint_id)
+        if adding:
+            complaints.update(
+                latest_remark=self.pk,
+                latest_remark_at=self.date,
+                remark_count=F("remark_count") + 1,
+            )
+        else:
+            complaints.refresh_remark_summary()
+
     def __str__(self):
         return f"Remark for Complaint {self.complaint.title}"
 
@@ -101,3 +390,156 @@ class DepartmentHistory(models.Model):
 
     def __str__(self):
         return f"{self.status} ({self.department})"
+
+
+class AttachmentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Attachments of the complaints and remarks ``user`` may see."""
+        if user.is_authenticated and roles.sees_all_complaints(user):
+            return self.all()
+        content_types = ContentType.objects.get_for_models(Complaint, Remark)
+        return self.filter(
+            Q(
+                content_type=content_types[Complaint],
+                object_id__in=Complaint.objects.visible_to(user).values("pk"),
+            )
+            | Q(
+                content_type=content_types[Remark],
+                object_id__in=Remark.objects.visible_to(user).values("pk"),
+            )
+        )
+
+
+class Attachment(models.Model):
+    """
+    A file attached to a complaint or a remark. Identical uploads share one
+    stored file; ``sha256`` is the content hash used to find it.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+    file = models.FileField(storage=get_attachment_storage, max_length=255)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    name = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=100, blank=True, default="")
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AttachmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["content_type", "object_id"], name="attachment_object_idx"),
+            models.Index(fields=["sha256"], name="attachment_sha256_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class DepartmentComplaintStatsQuerySet(models.QuerySet):
+    def apply_deltas(self, deltas):
+        """
+        Add ``deltas``, a mapping of (department id, status) to a count
+        change, with F() updates so concurrent writers never lose counts.
+        """
+        per_department = {}
+        for (department_id, status), delta in deltas.items():
+            if department_id is None or not delta:
+                continue
+            fields = per_department.setdefault(department_id, {})
+            field = status.lower()
+            fields[field] = fields.get(field, 0) + delta
+
+        for department_id, fields in per_department.items():
+            changes = {field: F(field) + delta for field, delta in fields.items() if delta}
+            if not changes:
+                continue
+            updated = self.filter(department_id=department_id).update(**changes)
+            # Only increments create the row; a decrement of a missing row
+            # comes from a department being deleted.
+            if not updated and any(delta > 0 for delta in fields.values()):
+                self.bulk_create([self.model(department_id=department_id)], ignore_conflicts=True)
+                self.filter(department_id=department_id).update(**changes)
+
+    def rebuild(self):
+        rows = (
+            Complaint.objects.order_by()
+            .values("targeted_department", "status")
+            .annotate(total=Count("id"))
+        )
+        stats = {}
+        for row in rows:
+            department_id = row["targeted_department"]
+            stat = stats.setdefault(department_id, self.model(department_id=department_id))
+            setattr(stat, row["status"].lower(), row["total"])
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(stats.values())
+        return len(stats)
+
+
+class DepartmentComplaintStats(models.Model):
+    department = models.OneToOneField(
+        Department, on_delete=models.CASCADE, primary_key=True, related_name="complaint_stats"
+    )
+    opened = models.IntegerField(default=0)
+    forwarded = models.IntegerField(default=0)
+    closed = models.IntegerField(default=0)
+
+    objects = DepartmentComplaintStatsQuerySet.as_manager()
+
+    @property
+    def total(self):
+        return self.opened + self.forwarded + self.closed
+
+    def __str__(self):
+        return f"{self.department}: {self.total} complaints"
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py run_jobs``."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after", "id"], name="job_ready_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
+
+
+class ImageRendition(models.Model):
+    """Derivatives of an attached image, keyed by the original's storage name."""
+
+    source = models.CharField(max_length=255, unique=True)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    thumbnail = models.ImageField(storage=get_attachment_storage, max_length=255)
+    webp = models.ImageField(storage=get_attachment_storage, max_length=255)
+    processed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.source
@@ -0,0 +1,127 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def keyset_fields(queryset, ordering):
+    """The model fields or annotation output fields behind ``ordering``."""
+    fields = []
+    for field in ordering:
+        name = field.lstrip("-")
+        if name in queryset.query.annotations:
+            fields.append(queryset.query.annotations[name].output_field)
+        else:
+            fields.append(queryset.model._meta.get_field(name))
+    return fields
+
+
+def decode_cursor(cursor, fields):
+    """
+    Values of a cursor made by ``encode_cursor``, converted by ``fields``.
+    Anything else, including well-formed cursors holding values of the
+    wrong type, is a 404.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(fields) or None in values:
+            raise ValueError
+        # Integers that don't fit in a database integer would fail in the query.
+        if any(isinstance(value, int) and not -(2**63) <= value < 2**63 for value in values):
+            raise ValueError
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError, binascii.Error):
+        raise Http404("Invalid cursor.")
+
+
+def keyset_filter(ordering, values):
+    # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, next_url):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.next_url = next_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginationMixin:
+    """
+    Cursor based pagination for ListViews.
+
+    Pages are fetched with a WHERE on the last seen ``keyset`` values instead
+    of OFFSET, so every page costs the same no matter how deep the user
+    scrolls. ``keyset`` must end with a unique field. htmx requests carrying a
+    cursor are answered with ``fragment_template_name`` (the next batch of rows
+    plus a new "load more" trigger).
+    """
+
+    paginate_by = 25
+    keyset = ()
+    cursor_kwarg = "cursor"
+    fragment_template_name = None
+
+    def get_keyset(self):
+        return self.keyset
+
+    def get_template_names(self):
+        if (
+            self.fragment_template_name
+            and self.request.htmx
+            and self.cursor_kwarg in self.request.GET
+        ):
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_keyset()
+        queryset = queryset.order_by(*ordering)
+
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if cursor:
+            values = decode_cursor(cursor, keyset_fields(queryset, ordering))
+            queryset = queryset.filter(keyset_filter(ordering, values))
+
+        object_list = list(queryset[: page_size + 1])
+        has_next = len(object_list) > page_size
+        object_list = object_list[:page_size]
+
+        next_cursor = next_url = None
+        if has_next:
+            last = object_list[-1]
+            next_cursor = encode_cursor(
+                [getattr(last, field.lstrip("-")) for field in ordering]
+            )
+            params = self.request.GET.copy()
+            params[self.cursor_kwarg] = next_cursor
+            next_url = f"{self.request.path}?{params.urlencode()}"
+
+        page = KeysetPage(object_list, next_cursor, next_url)
+        return (None, page, object_list, has_next)
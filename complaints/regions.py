@@ -0,0 +1,69 @@
+import json
+import os
+from importlib.util import find_spec
+
+# Importing mtaa parses its whole region/district/ward/street tree at import
+# time. Only regions and districts are needed here, so read the data file
+# directly, once per process, the first time a lookup asks for it.
+
+_index = {}
+
+
+def _normalise(name):
+    return " ".join(name.split())
+
+
+def _load():
+    path = os.path.join(os.path.dirname(find_spec("mtaa").origin), "tanzania_json.py")
+    with open(path, encoding="utf-8") as data:
+        tree = json.load(data)
+
+    regions = {}
+    for region, details in tree.items():
+        districts = {_normalise(district) for district in details.get("districts", {})}
+        regions[_normalise(region)] = tuple(sorted(districts))
+    regions = dict(sorted(regions.items()))
+
+    _index["regions"] = regions
+    _index["district_regions"] = {
+        district: region for region, districts in regions.items() for district in districts
+    }
+    _index["region_choices"] = tuple((region, region) for region in regions)
+    _index["district_choices"] = tuple(
+        (region, tuple((district, district) for district in districts))
+        for region, districts in regions.items()
+    )
+
+
+def _get(key):
+    if not _index:
+        _load()
+    return _index[key]
+
+
+def region_districts():
+    """Region name -> sorted tuple of its district names."""
+    return _get("regions")
+
+
+def region_choices():
+    return _get("region_choices")
+
+
+def district_choices():
+    """District choices grouped by region, for a select with optgroups."""
+    return _get("district_choices")
+
+
+def is_region(name):
+    return name in _get("regions")
+
+
+def is_district(name, region=None):
+    if region:
+        return name in _get("regions").get(region, ())
+    return name in _get("district_regions")
+
+
+def region_of(district):
+    return _get("district_regions").get(district)
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import Group
+
+CEO = "CEO"
+HOD = "HOD"
+EMPLOYEE = "EMPLOYEE"
+
+
+def group_names(user):
+    # Cached on the user instance, which lives for a single request.
+    if not user.is_authenticated:
+        return frozenset()
+    try:
+        return user._group_names
+    except AttributeError:
+        user._group_names = frozenset(user.groups.values_list("name", flat=True))
+        return user._group_names
+
+
+def has_role(user, name):
+    return name in group_names(user)
+
+
+def is_ceo(user):
+    return has_role(user, CEO)
+
+
+def is_hod(user):
+    return has_role(user, HOD)
+
+
+def is_employee(user):
+    return has_role(user, EMPLOYEE)
+
+
+def sees_all_complaints(user):
+    return user.is_superuser or is_ceo(user)
+
+
+
+_group_ids = {}
+
+
+def group_id(name):
+    # Process-wide name -> pk map; cleared by the Group save/delete signals.
+    try:
+        return _group_ids[name]
+    except KeyError:
+        _group_ids[name] = Group.objects.values_list("pk", flat=True).get(name=name)
+        return _group_ids[name]
+
+
+def clear_group_ids():
+    _group_ids.clear()
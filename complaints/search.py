@@ -0,0 +1,164 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Complaint
+
+FTS_TABLE = "complaints_complaint_fts"
+
+RANKED_KEYSET = ("-search_rank", "-id")
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query or "")
+
+
+class SearchDocumentBackend:
+    """Portable fallback: every term must appear in the search document."""
+
+    def search(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(search_document__icontains=term)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class MySQLFullTextBackend:
+    """
+    MATCH ... AGAINST on the complaint_search_ft FULLTEXT index.
+
+    InnoDB leaves stopwords and words shorter than innodb_ft_min_token_size
+    out of the index, so requiring them would match nothing; they are sent
+    as optional terms instead. Override the attributes when the server is
+    configured differently.
+    """
+
+    min_token_size = 3
+    # INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD
+    stopwords = frozenset(
+        "a about an are as at be by com de en for from how i in is it la of on "
+        "or that the this to was what when where who will with und www".split()
+    )
+
+    def indexed(self, term):
+        return len(term) >= self.min_token_size and term.lower() not in self.stopwords
+
+    def search(self, queryset, terms):
+        if not any(self.indexed(term) for term in terms):
+            return SearchDocumentBackend().search(queryset, terms)
+        expression = " ".join(
+            f"+{term}*" if self.indexed(term) else f"{term}*" for term in terms
+        )
+        rank = RawSQL(
+            f"MATCH ({Complaint._meta.db_table}.search_document) AGAINST (%s IN BOOLEAN MODE)",
+            [expression],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+
+
+class SQLiteFTS5Backend:
+    """FTS5 table kept in sync by triggers, see install_sqlite_fts()."""
+
+    def search(self, queryset, terms):
+        expression = " ".join(f'"{term}"*' for term in terms)
+        # Join the FTS table once; a correlated rank subquery re-runs MATCH per row.
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f"{FTS_TABLE}.rowid = {Complaint._meta.db_table}.id",
+                f"{FTS_TABLE} MATCH %s",
+            ],
+            params=[expression],
+        )
+        # bm25() is lower for better matches; negate it so higher ranks first.
+        rank = RawSQL(f"-{FTS_TABLE}.rank", [], output_field=FloatField())
+        return queryset.annotate(search_rank=rank)
+
+
+def get_search_backend():
+    path = getattr(settings, "COMPLAINTS_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "mysql":
+        return MySQLFullTextBackend()
+    if connection.vendor == "sqlite":
+        return SQLiteFTS5Backend()
+    return SearchDocumentBackend()
+
+
+def search_complaints(queryset, query):
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    return get_search_backend().search(queryset, terms)
+
+
+def install_sqlite_fts(connection):
+    # Run after every migrate: SQLite table rebuilds drop the triggers.
+    table = Complaint._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM sqlite_master WHERE name = '{FTS_TABLE}'")
+        created = cursor.fetchone() is None
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"search_document, content='{table}', content_rowid='id')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_document) "
+            f"VALUES (new.id, new.search_document); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+            f"VALUES ('delete', old.id, old.search_document); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+            f"VALUES ('delete', old.id, old.search_document); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_document) "
+            f"VALUES (new.id, new.search_document); END"
+        )
+        if created:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def refresh_search_documents(queryset, batch_size=1000):
+    batch = []
+    for complaint in queryset.with_related().iterator(chunk_size=batch_size):
+        complaint.search_document = complaint.build_search_document()
+        batch.append(complaint)
+        if len(batch) == batch_size:
+            Complaint.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    Complaint.objects.bulk_update(batch, ["search_document"])
+
+
+def snippet(text, query, width=60):
+    terms = search_terms(query)
+    if not text or not terms:
+        return ""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(match.start() - width, 0) if match else 0
+    end = min(start + width * 2, len(text))
+    excerpt = text[start:end]
+
+    parts = []
+    position = 0
+    for found in pattern.finditer(excerpt):
+        parts.append(escape(excerpt[position : found.start()]))
+        parts.append(f"<mark>{escape(found.group())}</mark>")
+        position = found.end()
+    parts.append(escape(excerpt[position:]))
+
+    prefix = "&hellip;" if start > 0 else ""
+    suffix = "&hellip;" if end < len(text) else ""
+    return mark_safe(prefix + "".join(parts) + suffix)
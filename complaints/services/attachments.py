@@ -0,0 +1,89 @@
+import hashlib
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from ..models import Attachment, ImageRendition
+from ..storage import attachment_storage
+from . import images
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(upload):
+    # AttachmentUploadHandler already hashed the upload while streaming it.
+    digest = getattr(upload, "sha256", None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in upload.chunks(CHUNK_SIZE):
+        sha256.update(chunk)
+    upload.seek(0)
+    return sha256.hexdigest()
+
+
+def attach(obj, uploads, uploaded_by=None):
+    """
+    Store ``uploads`` and attach them to ``obj`` with a single bulk insert.
+    Content already stored by an earlier upload is reused, not written again.
+    """
+    uploads = list(uploads)
+    if not uploads:
+        return []
+
+    digests = [content_hash(upload) for upload in uploads]
+    stored = dict(
+        Attachment.objects.filter(sha256__in=digests).values_list("sha256", "file").order_by()
+    )
+    content_type = ContentType.objects.get_for_model(obj)
+
+    attachments = []
+    for upload, digest in zip(uploads, digests):
+        # The stored copy may have been replaced by image processing since
+        # the lookup.
+        if digest not in stored or not attachment_storage.exists(stored[digest]):
+            name = attachment_storage.save(attachment_storage.hashed_name(digest, upload.name), upload)
+            stored[digest] = name
+            images.enqueue_processing(name)
+        attachments.append(
+            Attachment(
+                content_type=content_type,
+                object_id=obj.pk,
+                file=stored[digest],
+                sha256=digest,
+                size=upload.size,
+                name=upload.name[: Attachment._meta.get_field("name").max_length],
+                mime_type=getattr(upload, "content_type", None) or "",
+                uploaded_by=uploaded_by,
+            )
+        )
+    return Attachment.objects.bulk_create(attachments)
+
+
+def attachments_for(objects):
+    """
+    Attach ``attachment_list`` to each of ``objects`` (complaints and/or
+    remarks) using one query for the attachments and one for renditions.
+    """
+    objects = [obj for obj in objects if obj is not None]
+    condition = Q()
+    for model in {type(obj) for obj in objects}:
+        condition |= Q(
+            content_type=ContentType.objects.get_for_model(model),
+            object_id__in=[obj.pk for obj in objects if type(obj) is model],
+        )
+    found = list(Attachment.objects.filter(condition).order_by("pk")) if objects else []
+
+    renditions = ImageRendition.objects.in_bulk(
+        {attachment.file.name for attachment in found}, field_name="source"
+    )
+    grouped = {}
+    for attachment in found:
+        attachment.rendition = renditions.get(attachment.file.name)
+        grouped.setdefault((attachment.content_type_id, attachment.object_id), []).append(
+            attachment
+        )
+    for obj in objects:
+        content_type = ContentType.objects.get_for_model(obj)
+        obj.attachment_list = grouped.get((content_type.pk, obj.pk), [])
+    return found
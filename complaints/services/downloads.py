@@ -0,0 +1,113 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+CHUNK_SIZE = 64 * 1024
+CACHE_CONTROL = "private, max-age=3600"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Types a browser may render inline. Anything else is sent as a download,
+# so an uploaded HTML or SVG file can never run in the site's origin.
+INLINE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "application/pdf"}
+
+
+def parse_range(header, size):
+    """
+    (start, end) for a single ``bytes=`` range, inclusive; None to ignore
+    the header and send everything; ValueError when it can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if not start:
+        suffix = int(end)
+        if not suffix:
+            raise ValueError(header)
+        return max(size - suffix, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        if start >= size:
+            raise ValueError(header)
+        return None
+    return start, end
+
+
+def _read(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def serve(request, storage, name, filename):
+    """
+    Respond with the stored file ``name``, honouring If-None-Match, Range and
+    If-Range. With ATTACHMENT_SENDFILE_HEADER set, only headers are produced
+    and the web server sends the bytes (and handles ranges) itself.
+    """
+    try:
+        stat = os.stat(storage.path(name))
+    except FileNotFoundError:
+        raise Http404("Attachment file is missing.")
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Cache-Control"] = CACHE_CONTROL
+        return response
+
+    sendfile = settings.ATTACHMENT_SENDFILE_HEADER
+    byte_range = None
+    if not sendfile and "Range" in request.headers:
+        if request.headers.get("If-Range", etag) == etag:
+            try:
+                byte_range = parse_range(request.headers["Range"], stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{stat.st_size}"
+                return response
+
+    if sendfile == "X-Accel-Redirect":
+        response = HttpResponse(content_type=content_type)
+        response[sendfile] = quote(settings.ATTACHMENT_ACCEL_PREFIX + name)
+    elif sendfile:
+        response = HttpResponse(content_type=content_type)
+        response[sendfile] = storage.path(name)
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(storage.open(name), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = end - start + 1
+    else:
+        response = StreamingHttpResponse(
+            _read(storage.open(name), 0, stat.st_size), content_type=content_type
+        )
+        response["Content-Length"] = stat.st_size
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Cache-Control"] = CACHE_CONTROL
+    response["Content-Disposition"] = content_disposition_header(
+        content_type not in INLINE_TYPES, filename
+    )
+    return response
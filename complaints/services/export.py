@@ -0,0 +1,145 @@
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from ..models import DepartmentHistory, Remark
+from ..pagination import keyset_filter
+
+CHUNK_SIZE = 500
+ORDERING = ("-date_added", "-id")
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+CSV_FIELDS = [
+    "record",
+    "complaint_id",
+    "id",
+    "date",
+    "status",
+    "title",
+    "content",
+    "user",
+    "department",
+    "personnel",
+]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _name(obj):
+    return str(obj) if obj is not None else ""
+
+
+def _date(value):
+    return value.isoformat() if value else ""
+
+
+def export_queryset(queryset):
+    """Complaints with their remarks and department history attached."""
+    return (
+        queryset.with_related()
+        .order_by(*ORDERING)
+        .prefetch_related(
+            Prefetch(
+                "remarks",
+                queryset=Remark.objects.select_related(
+                    "respondent", "remark_targeted_department", "remark_targeted_personnel"
+                ).order_by("date", "id"),
+            ),
+            Prefetch(
+                "departmenthistory_set",
+                queryset=DepartmentHistory.objects.select_related("department").order_by("id"),
+            ),
+        )
+    )
+
+
+def iter_complaints(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Export complaints fetched chunk_size at a time, each chunk continuing
+    after the last one's (date_added, id). Unlike iterator(), which MySQL
+    drivers buffer in full, memory stays bounded however large the export.
+    """
+    queryset = export_queryset(queryset)
+    window = queryset
+    while True:
+        chunk = list(window[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        window = queryset.filter(keyset_filter(ORDERING, (last.date_added, last.pk)))
+
+
+def complaint_records(complaint):
+    yield {
+        "record": "complaint",
+        "complaint_id": complaint.pk,
+        "id": complaint.pk,
+        "date": _date(complaint.date_added),
+        "status": complaint.status,
+        "title": complaint.title,
+        "content": complaint.description,
+        "user": _name(complaint.complainant),
+        "department": _name(complaint.targeted_department),
+        "personnel": _name(complaint.targeted_personnel),
+    }
+    for remark in complaint.remarks.all():
+        yield {
+            "record": "remark",
+            "complaint_id": complaint.pk,
+            "id": remark.pk,
+            "date": _date(remark.date),
+            "status": remark.status,
+            "title": "",
+            "content": remark.content,
+            "user": _name(remark.respondent),
+            "department": _name(remark.remark_targeted_department),
+            "personnel": _name(remark.remark_targeted_personnel),
+        }
+    for history in complaint.departmenthistory_set.all():
+        yield {
+            "record": "history",
+            "complaint_id": complaint.pk,
+            "id": history.pk,
+            "date": "",
+            "status": history.status,
+            "title": "",
+            "content": "",
+            "user": "",
+            "department": _name(history.department),
+            "personnel": "",
+        }
+
+
+def export_csv(queryset, chunk_size=CHUNK_SIZE):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_FIELDS)
+    yield writer.writeheader()
+    for complaint in iter_complaints(queryset, chunk_size):
+        for record in complaint_records(complaint):
+            yield writer.writerow(record)
+
+
+def export_jsonl(queryset, chunk_size=CHUNK_SIZE):
+    for complaint in iter_complaints(queryset, chunk_size):
+        records = complaint_records(complaint)
+        line = next(records)
+        line["remarks"] = []
+        line["history"] = []
+        for record in records:
+            key = "remarks" if record["record"] == "remark" else "history"
+            line[key].append(record)
+        yield json.dumps(line) + "\n"
+
+
+def export_complaints(queryset, format="csv", chunk_size=CHUNK_SIZE):
+    if format == "jsonl":
+        return export_jsonl(queryset, chunk_size)
+    return export_csv(queryset, chunk_size)
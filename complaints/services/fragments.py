@@ -0,0 +1,20 @@
+from . import versions
+
+# Template fragments cached with {% cache %}. Each name has a version that
+# is part of the fragment's key; the signals bump it when the data behind
+# the fragment changes, which orphans every cached copy at once.
+DEPARTMENTS = "departments"
+GROUPS = "groups"
+
+
+def _key(name):
+    return f"fragments:{name}:version"
+
+
+def version(name):
+    return versions.get(_key(name))
+
+
+def bump(*names):
+    for name in names:
+        versions.bump(_key(name))
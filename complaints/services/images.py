@@ -0,0 +1,83 @@
+import hashlib
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from ..models import Attachment, ImageRendition
+from ..storage import attachment_storage
+from . import jobs
+
+THUMBNAIL_SIZE = (320, 320)
+WEBP_SIZE = (1600, 1600)
+WEBP_QUALITY = 80
+
+
+def enqueue_processing(name):
+    return jobs.enqueue("complaints.services.images.process_image", name=name)
+
+
+def _encode(image, format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def process_image(name, storage=attachment_storage):
+    """
+    Strip EXIF from the stored image ``name`` and record its dimensions plus
+    a thumbnail and a WebP derivative. Non-images are left alone and
+    already processed images are skipped, so the job can safely rerun.
+
+    The stripped image is stored under its own hash and the attachments are
+    moved to it; ``Attachment.sha256`` keeps the uploaded content's hash so
+    later uploads of the same file still deduplicate.
+    """
+    if ImageRendition.objects.filter(source=name).exists() or not storage.exists(name):
+        return None
+    try:
+        with storage.open(name) as source:
+            image = Image.open(source)
+            format = image.format
+            animated = getattr(image, "is_animated", False)
+            if format == "MPO":
+                # Multi-picture JPEGs (phone cameras) report several frames;
+                # keep the primary one as a plain JPEG so its EXIF goes too.
+                format, animated = "JPEG", False
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    if not animated:
+        # Store the image again without metadata (camera, GPS position, ...).
+        stripped = _encode(image, format, **({"quality": 95} if format == "JPEG" else {}))
+        digest = hashlib.sha256(stripped).hexdigest()
+        original, name = name, storage.save(storage.hashed_name(digest, name), ContentFile(stripped))
+        if name != original:
+            Attachment.objects.filter(file=original).update(file=name)
+            storage.delete(original)
+        existing = ImageRendition.objects.filter(source=name).first()
+        if existing:
+            return existing
+
+    # Derivatives sit next to the original: ab/cd/<sha256>.thumb.jpg
+    stem = os.path.splitext(name)[0]
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE)
+    webp = image.copy()
+    webp.thumbnail(WEBP_SIZE)
+
+    rendition = ImageRendition(source=name, width=image.width, height=image.height)
+    rendition.thumbnail.save(
+        f"{stem}.thumb.jpg", ContentFile(_encode(thumbnail.convert("RGB"), "JPEG", quality=85)), save=False
+    )
+    rendition.webp.save(
+        f"{stem}.webp", ContentFile(_encode(webp, "WEBP", quality=WEBP_QUALITY)), save=False
+    )
+    rendition.save()
+    return rendition
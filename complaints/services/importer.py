@@ -0,0 +1,164 @@
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import STATUS_CHOICES, Complaint, Department, DepartmentComplaintStats, User
+
+BATCH_SIZE = 1000
+
+# Accepted column names, first match wins. The second names are the columns
+# written by export_complaints, so an export can be imported again.
+COLUMNS = {
+    "title": ("title",),
+    "description": ("description", "content"),
+    "complainant": ("complainant", "user"),
+    "targeted_department": ("targeted_department", "department"),
+    "targeted_personnel": ("targeted_personnel", "personnel"),
+    "status": ("status",),
+    "date_added": ("date_added", "date"),
+}
+
+STATUSES = {value for value, _ in STATUS_CHOICES}
+
+
+class RejectedRow(ValueError):
+    pass
+
+
+def read_records(stream, format):
+    """Yield (line number, record dict) pairs without loading the whole file."""
+    if format == "jsonl":
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, RejectedRow(f"invalid JSON: {error}")
+                continue
+            yield number, record
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+
+
+class Lookups:
+    """Department names and usernames resolved once, up front."""
+
+    def __init__(self):
+        self.departments = {}
+        for department in Department.objects.only("pk", "name").order_by("-pk"):
+            self.departments[department.name] = department
+        self.users = {user.username: user for user in User.objects.only("pk", "username")}
+
+    def department(self, name):
+        try:
+            return self.departments[name]
+        except KeyError:
+            raise RejectedRow(f"unknown department {name!r}")
+
+    def user(self, username):
+        try:
+            return self.users[username]
+        except KeyError:
+            raise RejectedRow(f"unknown user {username!r}")
+
+
+def _value(record, field):
+    for column in COLUMNS[field]:
+        value = record.get(column)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+def build_complaint(record, lookups, now):
+    if isinstance(record, RejectedRow):
+        raise record
+    if not isinstance(record, dict):
+        raise RejectedRow(f"expected an object, got {type(record).__name__}")
+    if record.get("record", "complaint") != "complaint":
+        raise RejectedRow(f"not a complaint record ({record['record']!r})")
+
+    title = _value(record, "title")
+    description = _value(record, "description")
+    if not title:
+        raise RejectedRow("missing title")
+    if len(title) > Complaint._meta.get_field("title").max_length:
+        raise RejectedRow("title too long")
+    if not description:
+        raise RejectedRow("missing description")
+
+    status = _value(record, "status") or "Opened"
+    if status not in STATUSES:
+        raise RejectedRow(f"unknown status {status!r}")
+
+    date_added = now
+    if _value(record, "date_added"):
+        try:
+            # None for malformed text, ValueError for impossible dates.
+            date_added = parse_datetime(_value(record, "date_added"))
+        except ValueError:
+            date_added = None
+        if date_added is None:
+            raise RejectedRow("invalid date_added")
+        if timezone.is_naive(date_added):
+            date_added = timezone.make_aware(date_added)
+
+    complaint = Complaint(
+        title=title,
+        description=description,
+        complainant=lookups.user(_value(record, "complainant")),
+        targeted_department=lookups.department(_value(record, "targeted_department")),
+        targeted_personnel=lookups.user(_value(record, "targeted_personnel")),
+        status=status,
+        date_added=date_added,
+    )
+    # bulk_create() skips save(), which normally builds the search document.
+    complaint.search_document = complaint.build_search_document()
+    return complaint
+
+
+def import_complaints(records, batch_size=BATCH_SIZE, on_reject=None, on_batch=None):
+    """
+    Insert complaints from ``records`` (see read_records) with one
+    bulk_create and transaction per batch. Returns (imported, rejected).
+    """
+    lookups = Lookups()
+    now = timezone.now()
+    imported = rejected = 0
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        nonlocal imported
+        deltas = {}
+        for complaint in batch:
+            key = (complaint.targeted_department_id, complaint.status)
+            deltas[key] = deltas.get(key, 0) + 1
+        with transaction.atomic():
+            Complaint.objects.bulk_create(batch)
+            DepartmentComplaintStats.objects.apply_deltas(deltas)
+        imported += len(batch)
+        batch.clear()
+        if on_batch:
+            on_batch(imported, rejected, time.perf_counter() - started)
+
+    for number, record in records:
+        try:
+            batch.append(build_complaint(record, lookups, now))
+        except RejectedRow as error:
+            rejected += 1
+            if on_reject:
+                on_reject(number, str(error), record)
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return imported, rejected
@@ -0,0 +1,63 @@
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import Job
+
+MAX_ATTEMPTS = 5
+# A running job whose worker has not finished it by then is assumed dead.
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue(task, **payload):
+    """
+    Queue ``task`` (dotted path to a function) to run with ``payload`` as
+    keyword arguments. Created inside the caller's transaction, so the job
+    only becomes visible once the data it refers to is committed.
+    """
+    return Job.objects.create(task=task, payload=payload)
+
+
+def claim(limit=10):
+    now = timezone.now()
+    ready = Q(status=Job.PENDING, run_after__lte=now) | Q(
+        status=Job.RUNNING, locked_at__lt=now - LOCK_TIMEOUT
+    )
+    with transaction.atomic():
+        pks = list(
+            Job.objects.filter(ready)
+            .order_by("run_after", "id")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:limit]
+        )
+        Job.objects.filter(pk__in=pks).update(
+            status=Job.RUNNING, locked_at=now, attempts=F("attempts") + 1
+        )
+    return list(Job.objects.filter(pk__in=pks).order_by("run_after", "id"))
+
+
+def run(job):
+    try:
+        import_string(job.task)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=30 * 2 ** job.attempts)
+    else:
+        job.status = Job.DONE
+        job.last_error = ""
+    job.locked_at = None
+    job.save(update_fields=["status", "run_after", "locked_at", "last_error"])
+    return job
+
+
+def run_pending(limit=10):
+    """Claim and run one batch of jobs; returns the jobs that were run."""
+    return [run(job) for job in claim(limit)]
@@ -0,0 +1,10 @@
+from .. import search
+from ..models import Complaint
+
+
+def scoped_complaints(user, search_query=None):
+    # Complaints a user may list on the all complaints page and export.
+    queryset = Complaint.objects.visible_to(user)
+    if search_query:
+        queryset = search.search_complaints(queryset, search_query)
+    return queryset
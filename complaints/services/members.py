@@ -0,0 +1,25 @@
+from django.core.cache import cache
+
+from ..models import User
+from . import versions
+
+VERSION_KEY = "department_members:version"
+TIMEOUT = 60 * 60
+
+
+def department_members(department_id):
+    """(pk, username) pairs for a department, cached until users change."""
+    key = f"department_members:{versions.get(VERSION_KEY)}:{department_id}"
+    members = cache.get(key)
+    if members is None:
+        members = list(
+            User.objects.filter(departments_id=department_id, is_active=True)
+            .order_by("username")
+            .values_list("pk", "username")
+        )
+        cache.set(key, members, TIMEOUT)
+    return members
+
+
+def clear_department_members():
+    versions.bump(VERSION_KEY)
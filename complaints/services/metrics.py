@@ -0,0 +1,104 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Upper bounds (ms) of the wall time histogram buckets; the last bucket
+# holds everything slower.
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# The collector of the request being handled, if any.
+current = ContextVar("request_metrics", default=None)
+
+_samples = {}
+_lock = threading.Lock()
+
+
+class RequestCollector:
+    """Database and template time accumulated while one request runs."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def execute(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self, wall_time):
+        return ", ".join(
+            [
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+                f"tpl;dur={self.template_time * 1000:.1f}",
+                f"total;dur={wall_time * 1000:.1f}",
+            ]
+        )
+
+
+def record(view, wall_time, collector, size):
+    samples = _samples.get(view)
+    if samples is None:
+        with _lock:
+            samples = _samples.setdefault(
+                view, deque(maxlen=settings.REQUEST_METRICS_WINDOW)
+            )
+    samples.append(
+        (wall_time, collector.queries, collector.db_time, collector.template_time, size)
+    )
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0
+
+
+def summary():
+    """Per view figures over its last REQUEST_METRICS_WINDOW requests, slowest p95 first."""
+    rows = []
+    for view, samples in list(_samples.items()):
+        samples = list(samples)
+        if not samples:
+            continue
+        walls = sorted(sample[0] * 1000 for sample in samples)
+        histogram = [0] * (len(BUCKETS_MS) + 1)
+        for wall in walls:
+            histogram[bisect_left(BUCKETS_MS, wall)] += 1
+        sizes = [sample[4] for sample in samples if sample[4] is not None]
+        rows.append(
+            {
+                "view": view,
+                "requests": len(samples),
+                "p50_ms": _percentile(walls, 0.5),
+                "p95_ms": _percentile(walls, 0.95),
+                "max_ms": walls[-1],
+                "queries": _mean([sample[1] for sample in samples]),
+                "db_ms": _mean([sample[2] * 1000 for sample in samples]),
+                "template_ms": _mean([sample[3] * 1000 for sample in samples]),
+                "kilobytes": _mean(sizes) / 1024,
+                "histogram": histogram,
+            }
+        )
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+def bucket_labels():
+    labels = [f"≤{bound}" for bound in BUCKETS_MS]
+    return labels + [f">{BUCKETS_MS[-1]}"]
+
+
+def reset():
+    with _lock:
+        _samples.clear()
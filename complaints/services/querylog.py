@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.template.base import Template
+from django.utils import timezone
+
+SLOW = "slow"
+DUPLICATE = "duplicate"
+REPEATED = "repeated"
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+# Frames from the instrumentation itself are not where a query came from.
+_PACKAGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIPPED = {
+    os.path.join(_PACKAGE, "services", "querylog.py"),
+    os.path.join(_PACKAGE, "services", "metrics.py"),
+    os.path.join(_PACKAGE, "middleware.py"),
+    os.path.join(_PACKAGE, "template_backend.py"),
+}
+_write_lock = threading.Lock()
+
+
+def normalize(sql):
+    """SQL with its literals and placeholders as ? and IN lists folded."""
+    sql = _STRINGS.sub("?", sql).replace("%s", "?")
+    sql = _NUMBERS.sub("?", sql)
+    sql = _PLACEHOLDER_LISTS.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def origin():
+    """
+    The innermost project frame (outside installed packages) on the stack,
+    with the template being rendered when the query came from one.
+    """
+    root = os.path.abspath(settings.BASE_DIR)
+    template = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.abspath(code.co_filename)
+        if template is None and code.co_name == "render":
+            candidate = frame.f_locals.get("self")
+            if isinstance(candidate, Template):
+                template = candidate.origin.template_name
+        if (
+            filename.startswith(root)
+            and filename not in _SKIPPED
+            and "site-packages" not in filename
+        ):
+            return {
+                "file": os.path.relpath(filename, root),
+                "line": frame.f_lineno,
+                "function": code.co_name,
+                "template": template,
+            }
+        frame = frame.f_back
+    return None
+
+
+class RequestQueries:
+    """
+    Watch one request's queries and note the slow ones, exact repeats of an
+    earlier query (same SQL and parameters) and shapes run REPEATED_QUERY_COUNT
+    times with different parameters, which usually means a loop of lookups.
+    """
+
+    def __init__(self):
+        self.slow_ms = settings.SLOW_QUERY_MS
+        self.repeat_count = settings.REPEATED_QUERY_COUNT
+        self.statements = Counter()
+        self.shapes = Counter()
+        self.events = []
+
+    def execute(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.note(sql, params, (time.perf_counter() - started) * 1000)
+
+    def note(self, sql, params, duration_ms):
+        self.statements[(sql, repr(params))] += 1
+        normalized = normalize(sql)
+        self.shapes[normalized] += 1
+
+        kinds = []
+        if duration_ms >= self.slow_ms:
+            kinds.append(SLOW)
+        if self.statements[(sql, repr(params))] > 1:
+            kinds.append(DUPLICATE)
+        elif self.shapes[normalized] == self.repeat_count:
+            kinds.append(REPEATED)
+        if not kinds:
+            return
+        where = origin()
+        for kind in kinds:
+            self.events.append(
+                {
+                    "kind": kind,
+                    "fingerprint": fingerprint(normalized),
+                    "sql": normalized,
+                    "duration_ms": round(duration_ms, 3),
+                    "origin": where,
+                }
+            )
+
+
+def write(request, events, path=None):
+    """Append a request's events to the JSONL query log."""
+    if not events:
+        return
+    match = request.resolver_match
+    common = {
+        "time": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else None,
+    }
+    lines = "".join(json.dumps({**common, **event}) + "\n" for event in events)
+    path = path or settings.QUERY_LOG_PATH
+    with _write_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as log:
+            log.write(lines)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
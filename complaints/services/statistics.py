@@ -0,0 +1,47 @@
+from django.db.models import Count
+
+from ..models import Department, DepartmentComplaintStats, User
+
+
+def _grouped_counts(queryset, field, limit=None):
+    rows = (
+        queryset.order_by()
+        .values(field)
+        .annotate(total=Count("id"))
+        .order_by("-total", field)
+    )
+    if limit is not None:
+        rows = rows[:limit]
+    return [(row[field], row["total"]) for row in rows]
+
+
+def _resolve(model, counts):
+    objects = model.objects.in_bulk([pk for pk, _ in counts])
+    return [(objects[pk], total) for pk, total in counts if pk in objects]
+
+
+def complaint_counts_by_personnel(queryset, limit=None):
+    return _resolve(User, _grouped_counts(queryset, "targeted_personnel", limit))
+
+
+def complaint_counts_by_department(queryset, limit=None):
+    return _resolve(Department, _grouped_counts(queryset, "targeted_department", limit))
+
+
+def complaint_counts_by_status(queryset):
+    return dict(_grouped_counts(queryset, "status"))
+
+
+def personnel_with_most_complaints(queryset):
+    top = complaint_counts_by_personnel(queryset, limit=1)
+    return top[0][0] if top else None
+
+
+def department_stats(departments=None):
+    """Per-department status counters, read from the summary table."""
+    stats = DepartmentComplaintStats.objects.select_related("department").order_by(
+        "department__name"
+    )
+    if departments is not None:
+        stats = stats.filter(department__in=departments)
+    return stats
@@ -0,0 +1,16 @@
+from django.core.cache import cache
+
+# A number kept in the cache and made part of other cache keys: bumping it
+# orphans every entry built under the old number at once.
+
+
+def get(key):
+    return cache.get_or_set(key, 1, None)
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Not in the cache (evicted or never read): start past the default.
+        cache.set(key, 2, None)
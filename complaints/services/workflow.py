@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ..models import Complaint, DepartmentComplaintStats, DepartmentHistory, Remark
+from .. import search
+
+FORWARDED = "Forwarded"
+CLOSED = "Closed"
+
+
+def add_remark(remark):
+    """
+    Save ``remark`` and apply its forward/close transition to the complaint
+    in one transaction, holding a row lock on the complaint.
+    """
+    with transaction.atomic():
+        remark.complaint = Complaint.objects.select_for_update().get(pk=remark.complaint_id)
+        remark.save()
+    return remark
+
+
+def forward(complaint, respondent, department, personnel, content):
+    return add_remark(
+        Remark(
+            complaint=complaint,
+            respondent=respondent,
+            content=content,
+            status=FORWARDED,
+            remark_targeted_department=department,
+            remark_targeted_personnel=personnel,
+        )
+    )
+
+
+def close(complaint, respondent, content):
+    return add_remark(
+        Remark(
+            complaint=complaint,
+            respondent=respondent,
+            content=content,
+            status=CLOSED,
+            remark_targeted_department_id=complaint.targeted_department_id,
+            remark_targeted_personnel_id=complaint.complainant_id,
+        )
+    )
+
+
+def bulk_forward(complaints, respondent, department, personnel, content):
+    return _bulk_transition(
+        complaints, respondent, FORWARDED, content, department=department, personnel=personnel
+    )
+
+
+def bulk_close(complaints, respondent, content):
+    return _bulk_transition(complaints, respondent, CLOSED, content)
+
+
+def _bulk_transition(complaints, respondent, status, content, department=None, personnel=None):
+    """
+    Apply one transition to many complaints: a single UPDATE on Complaint
+    and bulk inserts for Remark and DepartmentHistory. ``complaints`` is a
+    queryset or an iterable of complaints or primary keys. Returns the
+    created remarks.
+    """
+    if isinstance(complaints, QuerySet):
+        pks = list(complaints.values_list("pk", flat=True))
+    else:
+        pks = [getattr(complaint, "pk", complaint) for complaint in complaints]
+
+    with transaction.atomic():
+        locked = list(
+            Complaint.objects.filter(pk__in=pks)
+            .select_for_update()
+            .order_by("pk")
+            .only("pk", "status", "targeted_department", "complainant")
+        )
+        if not locked:
+            return []
+        pks = [complaint.pk for complaint in locked]
+
+        remarks = [
+            Remark(
+                complaint=complaint,
+                respondent=respondent,
+                content=content,
+                status=status,
+                remark_targeted_department_id=(
+                    department.pk if department else complaint.targeted_department_id
+                ),
+                remark_targeted_personnel_id=(
+                    personnel.pk if personnel else complaint.complainant_id
+                ),
+            )
+            for complaint in locked
+        ]
+        history = [
+            DepartmentHistory(
+                complaint=complaint,
+                department_id=(
+                    department.pk if department else complaint.targeted_department_id
+                ),
+                status=status,
+            )
+            for complaint in locked
+            if complaint.status != status
+        ]
+
+        changes = {"status": status, "date_modified": timezone.now()}
+        moved = []
+        if department is not None:
+            changes["targeted_department"] = department
+            moved = [
+                complaint.pk
+                for complaint in locked
+                if complaint.targeted_department_id != department.pk
+            ]
+
+        deltas = {}
+        for complaint in locked:
+            old = (complaint.targeted_department_id, complaint.status)
+            new = (department.pk if department else complaint.targeted_department_id, status)
+            if old != new:
+                deltas[old] = deltas.get(old, 0) - 1
+                deltas[new] = deltas.get(new, 0) + 1
+
+        Remark.objects.bulk_create(remarks)
+        Complaint.objects.filter(pk__in=pks).refresh_remark_summary(**changes)
+        DepartmentComplaintStats.objects.apply_deltas(deltas)
+        DepartmentHistory.objects.bulk_create(history)
+        if moved:
+            search.refresh_search_documents(Complaint.objects.filter(pk__in=moved))
+
+    return remarks
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import Group
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import roles, search
+from .services import fragments, members
+from .models import Complaint, Department, DepartmentComplaintStats, Remark, User
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def clear_group_ids(sender, **kwargs):
+    roles.clear_group_ids()
+    fragments.bump(fragments.GROUPS)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def bump_department_fragments(sender, **kwargs):
+    fragments.bump(fragments.DEPARTMENTS)
+
+
+@receiver(post_save, sender=Department)
+def refresh_department_search_documents(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None and "name" not in update_fields):
+        return
+    changed = instance.changed_fields()
+    if changed is not None and "name" not in changed:
+        return
+    search.refresh_search_documents(Complaint.objects.filter(targeted_department=instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_department_members(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"departments", "username", "is_active"} & set(
+        update_fields
+    ):
+        return
+    members.clear_department_members()
+
+
+@receiver(post_save, sender=User)
+def refresh_user_search_documents(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None and "username" not in update_fields):
+        return
+    changed = instance.changed_fields()
+    if changed is not None and "username" not in changed:
+        return
+    search.refresh_search_documents(
+        Complaint.objects.filter(Q(complainant=instance) | Q(targeted_personnel=instance))
+    )
+
+
+@receiver(post_delete, sender=Complaint)
+def decrement_complaint_stats(sender, instance, **kwargs):
+    DepartmentComplaintStats.objects.apply_deltas(
+        {(instance.targeted_department_id, instance.status): -1}
+    )
+
+
+@receiver(post_delete, sender=Remark)
+def refresh_remark_summary(sender, instance, origin=None, **kwargs):
+    # Nothing to maintain when the complaint itself is being deleted.
+    if isinstance(origin, Complaint) or getattr(origin, "model", None) is Complaint:
+        return
+    Complaint.objects.filter(pk=instance.complaint_id).refresh_remark_summary()
+
+
+def install_search_index(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        search.install_sqlite_fts(connection)
@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Private file storage addressed by SHA-256: ``ab/cd/abcd....jpg``.
+
+    Files live outside MEDIA_ROOT and have no public URL; they are served by
+    the authorization-checked ``complaints:attachment`` view. Saving a name
+    that already exists keeps the stored file, since equal names mean equal
+    content.
+    """
+
+    def __init__(self, location=None, **kwargs):
+        super().__init__(location=location, base_url=None, **kwargs)
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.ATTACHMENT_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == "ATTACHMENT_ROOT":
+            self.__dict__.pop("base_location", None)
+            self.__dict__.pop("location", None)
+
+    def hashed_name(self, digest, filename, suffix=""):
+        extension = os.path.splitext(filename)[1].lower()
+        return f"{digest[:2]}/{digest[2:4]}/{digest}{suffix}{extension}"
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        # Write to a temporary file and link it into place, so a name only
+        # ever holds complete content. FileSystemStorage._save would retry
+        # forever when an identical upload lands first, as the name never
+        # changes; here that just means the content is already stored.
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            try:
+                os.link(temporary, full_path)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(temporary)
+        return name.replace("\\", "/")
+
+    def url(self, name):
+        raise ValueError("Attachments have no public URL; link to complaints:attachment.")
+
+
+attachment_storage = ContentAddressedStorage()
+
+
+def get_attachment_storage():
+    return attachment_storage
@@ -0,0 +1,34 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .services import metrics
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        collector = metrics.current.get()
+        # Only the outermost render is timed so nested renders aren't counted twice.
+        if collector is None or collector.rendering:
+            return super().render(context, request)
+        collector.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            collector.template_time += time.perf_counter() - started
+            collector.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, adding render time to the request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
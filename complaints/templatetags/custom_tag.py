@@ -1,10 +1,40 @@
 from django import template
-from django.contrib.auth.models import Group
+
+from complaints import avatars, search
+from complaints.roles import CEO, EMPLOYEE, HOD, group_names
+from complaints.services import fragments
 
 register = template.Library()
 
 
 @register.filter(name="has_group")
 def has_group(user, group_name):
-    group = Group.objects.get(name=group_name)
-    return group in user.groups.all()
+    return group_name in group_names(user)
+
+
+@register.simple_tag
+def user_roles(user):
+    names = group_names(user)
+    return {
+        "ceo": CEO in names,
+        "hod": HOD in names,
+        "employee": EMPLOYEE in names,
+        "names": names,
+    }
+
+
+@register.filter(name="search_snippet")
+def search_snippet(text, query):
+    return search.snippet(text, query)
+
+
+@register.simple_tag
+def avatar_url(user, size):
+    """URL of ``user``'s avatar variant for an image displayed ``size`` pixels wide."""
+    return avatars.avatar_url(user, size)
+
+
+@register.simple_tag
+def fragment_version(name):
+    """Version to vary a {% cache %} block on; see services/fragments.py."""
+    return fragments.version(name)
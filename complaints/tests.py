@@ -1,3 +1,1311 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Count
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Complaint,
+    Department,
+    DepartmentComplaintStats,
+    DepartmentHistory,
+    ImageRendition,
+    Job,
+    Remark,
+    User,
+)
+from . import avatars, pagination, regions, roles, search, warmup
+from .forms import AddComplaintForm, AddRemarkForm
+from .templatetags import custom_tag
+from .storage import attachment_storage
+from .services import attachments, export, images, importer, jobs, members, metrics, querylog, workflow
+
+
+class QueryBudgetMixin:
+    """
+    Fail when a view runs more queries than its budget.
+
+    Budgets are ceilings measured against pages holding many rows, so a
+    template that starts touching a relation per row (N+1) blows straight
+    through them.
+    """
+
+    def assertQueryBudget(self, budget, user, url, **extra):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{i}. {query['sql']}"
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f"{url} ran {executed} queries, budget is {budget}:\n{queries}")
+        return response
+
+
+class ComplaintsTestData:
+    @classmethod
+    def setUpTestData(cls):
+        permissions = Permission.objects.filter(content_type__app_label="complaints")
+        cls.groups = {}
+        for name in ("CEO", "HOD", "EMPLOYEE"):
+            cls.groups[name] = Group.objects.create(name=name)
+            cls.groups[name].permissions.set(permissions)
+
+        cls.ict = Department.objects.create(name="ict", description="ict")
+        cls.hr = Department.objects.create(name="hr", description="hr")
+
+        cls.ceo = User.objects.create_user("ceo", password="pass", departments=cls.ict)
+        cls.ceo.groups.add(cls.groups["CEO"])
+        cls.hod = User.objects.create_user("hod", password="pass", departments=cls.ict)
+        cls.hod.groups.add(cls.groups["HOD"])
+
+        cls.employees = []
+        for i in range(12):
+            employee = User.objects.create_user(
+                f"employee{i}", password="pass", departments=cls.ict if i % 2 else cls.hr
+            )
+            employee.groups.add(cls.groups["EMPLOYEE"])
+            cls.employees.append(employee)
+
+        cls.complaints = []
+        for i in range(30):
+            cls.complaints.append(
+                Complaint.objects.create(
+                    title=f"complaint {i}",
+                    description="description",
+                    complainant=cls.employees[i % 12],
+                    targeted_department=cls.ict,
+                    targeted_personnel=cls.employees[(i + 1) % 12],
+                )
+            )
+
+        cls.complaint = cls.complaints[0]
+        for i in range(10):
+            cls.remark = Remark.objects.create(
+                complaint=cls.complaint,
+                respondent=cls.employees[i % 12],
+                content="remark",
+                status="Forwarded",
+                remark_targeted_personnel=cls.employees[(i + 3) % 12],
+                remark_targeted_department=cls.ict,
+            )
+
+
+class ViewQueryBudgetTests(QueryBudgetMixin, ComplaintsTestData, TestCase):
+    def test_all_complaints_ceo(self):
+        self.assertQueryBudget(10, self.ceo, reverse("complaints:all_complaints_display"))
+
+    def test_all_complaints_hod(self):
+        self.assertQueryBudget(11, self.hod, reverse("complaints:all_complaints_display"))
+
+    def test_all_complaints_next_page(self):
+        response = self.assertQueryBudget(
+            10, self.ceo, reverse("complaints:all_complaints_display")
+        )
+        self.assertContains(response, 'form="bulk-transition-form"')
+        self.assertQueryBudget(
+            8, self.ceo, response.context["page_obj"].next_url, HTTP_HX_REQUEST="true"
+        )
+
+    def test_home(self):
+        self.assertQueryBudget(5, self.employees[1], reverse("complaints:home"))
+
+    def test_my_complaints(self):
+        self.assertQueryBudget(
+            4, self.employees[1], reverse("complaints:user_complaints_display")
+        )
+
+    def test_all_users_ceo(self):
+        self.assertQueryBudget(9, self.ceo, reverse("complaints:all_users_display"))
+
+    def test_all_users_hod(self):
+        self.assertQueryBudget(8, self.hod, reverse("complaints:all_users_display"))
+
+    def test_complaint_details(self):
+        # Content types are cached for the life of the process.
+        ContentType.objects.get_for_models(Complaint, Remark)
+        self.assertQueryBudget(
+            9, self.ceo, reverse("complaints:complaint_details", args=[self.complaint.pk])
+        )
+
+    def test_remark_details(self):
+        self.assertQueryBudget(
+            6, self.ceo, reverse("complaints:view_remark_details", args=[self.remark.pk])
+        )
+
+
+class ComplaintChangeTrackingTests(ComplaintsTestData, TestCase):
+    def load(self):
+        return Complaint.objects.with_related().get(pk=self.complaint.pk)
+
+    def save_and_capture(self, complaint):
+        with CaptureQueriesContext(connection) as context:
+            complaint.save()
+        return [query["sql"] for query in context.captured_queries]
+
+    def test_unchanged_save_runs_no_queries(self):
+        complaint = self.load()
+        with self.assertNumQueries(0):
+            complaint.save()
+
+    def test_only_changed_columns_are_written(self):
+        complaint = self.load()
+        complaint.title = "new title"
+        queries = self.save_and_capture(complaint)
+        self.assertFalse([sql for sql in queries if sql.startswith("SELECT")])
+        [update] = [sql for sql in queries if sql.startswith("UPDATE")]
+        columns = update.split(" SET ", 1)[1].split(" WHERE ", 1)[0]
+        self.assertIn('"title"', columns)
+        self.assertIn('"search_document"', columns)
+        for column in ('"status"', '"description"', '"latest_remark_id"', '"remark_count"'):
+            self.assertNotIn(column, columns)
+
+    def test_status_change_writes_history_without_reading(self):
+        complaint = self.load()
+        complaint.status = "Closed"
+        history = DepartmentHistory.objects.count()
+        queries = self.save_and_capture(complaint)
+        self.assertFalse([sql for sql in queries if sql.startswith("SELECT")])
+        self.assertEqual(DepartmentHistory.objects.count(), history + 1)
+        self.assertEqual(Complaint.objects.get(pk=complaint.pk).status, "Closed")
+
+    def test_edits_survive_loading_a_deferred_field(self):
+        complaint = Complaint.objects.defer("description").get(pk=self.complaint.pk)
+        complaint.title = "edited"
+        self.assertEqual(complaint.description, "description")
+        complaint.save()
+        self.assertEqual(Complaint.objects.get(pk=complaint.pk).title, "edited")
+
+    def test_edits_survive_a_partial_refresh(self):
+        complaint = self.load()
+        complaint.title = "edited"
+        complaint.refresh_from_db(fields=["status"])
+        self.assertEqual(complaint.changed_fields(), {"title"})
+        complaint.save()
+        self.assertEqual(Complaint.objects.get(pk=complaint.pk).title, "edited")
+
+        complaint.title = "discarded"
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.changed_fields(), set())
+
+    def test_snapshot_resets_after_save(self):
+        complaint = self.load()
+        complaint.status = "Closed"
+        complaint.save()
+        self.assertEqual(complaint.changed_fields(), set())
+        history = DepartmentHistory.objects.count()
+        complaint.status = "Closed"
+        with self.assertNumQueries(0):
+            complaint.save()
+        self.assertEqual(DepartmentHistory.objects.count(), history)
+
+
+class RoleTests(ComplaintsTestData, TestCase):
+    def test_roles_resolve_with_one_query(self):
+        user = User.objects.get(pk=self.hod.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(roles.is_hod(user))
+            self.assertFalse(roles.is_ceo(user))
+            self.assertFalse(roles.is_employee(user))
+            self.assertFalse(roles.sees_all_complaints(user))
+            self.assertEqual(
+                custom_tag.user_roles(user),
+                {"ceo": False, "hod": True, "employee": False, "names": frozenset({"HOD"})},
+            )
+        self.assertTrue(roles.sees_all_complaints(User.objects.get(pk=self.ceo.pk)))
+
+    def test_anonymous_user_has_no_roles(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.group_names(AnonymousUser()), frozenset())
+            self.assertFalse(roles.is_ceo(AnonymousUser()))
+
+    def test_page_reads_groups_once(self):
+        cache.clear()
+        self.client.force_login(self.hod)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("complaints:all_complaints_display"))
+        group_queries = [
+            query["sql"] for query in context.captured_queries if '"auth_group"."name"' in query["sql"]
+        ]
+        self.assertEqual(len(group_queries), 1)
+
+
+class GroupLookupTests(ComplaintsTestData, TestCase):
+    def test_has_group_filter_uses_cached_names(self):
+        user = User.objects.get(pk=self.ceo.pk)
+        template = Template("{% load custom_tag %}{{ user|has_group:'CEO' }} {{ user|has_group:'HOD' }}")
+        with self.assertNumQueries(1):
+            self.assertEqual(template.render(Context({"user": user})), "True False")
+        with self.assertNumQueries(0):
+            template.render(Context({"user": user}))
+            self.assertTrue(custom_tag.has_group(user, "CEO"))
+
+    def test_group_ids_are_cleared_on_group_changes(self):
+        roles.clear_group_ids()
+        with self.assertNumQueries(1):
+            self.assertEqual(roles.group_id("HOD"), self.groups["HOD"].pk)
+            roles.group_id("HOD")
+
+        self.groups["HOD"].delete()
+        replacement = Group.objects.create(name="HOD")
+        with self.assertNumQueries(1):
+            self.assertEqual(roles.group_id("HOD"), replacement.pk)
+
+        replacement.name = "HEAD"
+        replacement.save()
+        with self.assertRaises(Group.DoesNotExist):
+            roles.group_id("HOD")
+
+
+class RemarkTransitionTests(ComplaintsTestData, TestCase):
+    def state(self, complaint):
+        return Complaint.objects.values_list(
+            "status", "targeted_department_id", "remark_count", "latest_remark_id"
+        ).get(pk=complaint.pk)
+
+    def stats(self):
+        return list(DepartmentComplaintStats.objects.order_by("pk").values_list())
+
+    def assertStatsConsistent(self):
+        stats = self.stats()
+        DepartmentComplaintStats.objects.rebuild()
+        self.assertEqual(stats, self.stats())
+
+    def test_forward_updates_status_and_summary_together(self):
+        complaint = self.complaints[1]
+        self.client.force_login(self.hod)
+        response = self.client.post(
+            reverse("complaints:add_remark", args=[complaint.pk]),
+            {
+                "complaint": complaint.pk,
+                "content": "over to hr",
+                "status": "Forwarded",
+                "remark_targeted_personnel": self.employees[2].pk,
+                "remark_targeted_department": self.hr.pk,
+            },
+        )
+        self.assertRedirects(response, reverse("complaints:complaint_details", args=[complaint.pk]))
+        remark = Remark.objects.get(complaint=complaint)
+        self.assertEqual(self.state(complaint), ("Forwarded", self.hr.pk, 1, remark.pk))
+        self.assertTrue(
+            DepartmentHistory.objects.filter(complaint=complaint, status="Forwarded").exists()
+        )
+        self.assertStatsConsistent()
+
+    def test_failure_rolls_back_the_whole_transition(self):
+        complaint = self.complaints[1]
+        before = (self.state(complaint), self.stats(), DepartmentHistory.objects.count())
+        with mock.patch(
+            "complaints.models.ComplaintQuerySet.update", side_effect=DatabaseError("boom")
+        ):
+            with self.assertRaises(DatabaseError):
+                workflow.forward(complaint, self.hod, self.hr, self.employees[2], "over to hr")
+        after = (self.state(complaint), self.stats(), DepartmentHistory.objects.count())
+        self.assertEqual(after, before)
+        self.assertFalse(Remark.objects.filter(complaint=complaint).exists())
+
+    def test_transition_starts_from_the_locked_row(self):
+        stale = Complaint.objects.get(pk=self.complaints[1].pk)
+        workflow.close(Complaint.objects.get(pk=stale.pk), self.hod, "closed elsewhere")
+        Complaint.objects.filter(pk=stale.pk).update(title="renamed elsewhere")
+
+        remark = workflow.forward(stale, self.hod, self.hr, self.employees[2], "reopen for hr")
+        self.assertEqual(self.state(stale), ("Forwarded", self.hr.pk, 2, remark.pk))
+        self.assertEqual(Complaint.objects.get(pk=stale.pk).title, "renamed elsewhere")
+        self.assertEqual(
+            list(DepartmentHistory.objects.filter(complaint=stale).order_by("pk").values_list("status", flat=True)),
+            ["Closed", "Forwarded"],
+        )
+        self.assertStatsConsistent()
+
+
+class SearchTests(ComplaintsTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.matches = {}
+        for title in ("printer jammed", "printer printer printer toner", "network down"):
+            cls.matches[title] = Complaint.objects.create(
+                title=title,
+                description="description",
+                complainant=cls.employees[0],
+                targeted_department=cls.hr,
+                targeted_personnel=cls.employees[2],
+            )
+
+    def found(self, query, queryset=None):
+        queryset = Complaint.objects.all() if queryset is None else queryset
+        results = search.search_complaints(queryset, query).order_by(*search.RANKED_KEYSET)
+        return [complaint.title for complaint in results]
+
+    def test_fts_matches_prefixes_of_every_term(self):
+        self.assertIsInstance(search.get_search_backend(), search.SQLiteFTS5Backend)
+        self.assertCountEqual(self.found("print"), ["printer jammed", "printer printer printer toner"])
+        self.assertEqual(self.found("printer TON"), ["printer printer printer toner"])
+        self.assertEqual(self.found("scanner"), [])
+        self.assertFalse(search.search_complaints(Complaint.objects.all(), "  !! ").exists())
+
+    def test_fts_ranks_better_matches_first(self):
+        self.assertEqual(self.found("printer"), ["printer printer printer toner", "printer jammed"])
+
+    def test_documents_follow_renames(self):
+        self.hr.name = "procurement"
+        self.hr.save()
+        self.assertIn("network down", self.found("procurement"))
+        self.employees[2].username = "technician"
+        self.employees[2].save()
+        self.assertIn("network down", self.found("technician"))
+
+        complaint = self.matches["network down"]
+        complaint.title = "wifi down"
+        complaint.save()
+        self.assertEqual(self.found("network"), [])
+        self.assertEqual(self.found("wifi"), ["wifi down"])
+
+    def test_documents_only_refresh_on_renames(self):
+        user = User.objects.get(pk=self.employees[2].pk)
+        department = Department.objects.get(pk=self.hr.pk)
+        with mock.patch.object(search, "refresh_search_documents") as refresh:
+            user.email = "employee2@example.com"
+            user.save()
+            department.description = "people"
+            department.save()
+            self.assertFalse(refresh.called)
+            user.username = "technician"
+            user.save()
+            department.name = "procurement"
+            department.save()
+            self.assertEqual(refresh.call_count, 2)
+
+    def test_triggers_are_reinstalled(self):
+        # Migrations that rebuild the complaint table drop its triggers.
+        with connection.cursor() as cursor:
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_{suffix}")
+        search.install_sqlite_fts(connection)
+        search.install_sqlite_fts(connection)
+        complaint = self.matches["network down"]
+        complaint.title = "wifi down"
+        complaint.save()
+        self.assertEqual(self.found("wifi"), ["wifi down"])
+
+    @override_settings(COMPLAINTS_SEARCH_BACKEND="complaints.search.SearchDocumentBackend")
+    def test_portable_backend(self):
+        self.assertCountEqual(self.found("PRINTER"), ["printer jammed", "printer printer printer toner"])
+        self.assertEqual(self.found("printer jammed"), ["printer jammed"])
+
+    def test_mysql_fulltext_query(self):
+        queryset = search.MySQLFullTextBackend().search(Complaint.objects.all(), ["print", "toner"])
+        sql, params = queryset.query.sql_with_params()
+        self.assertIn("MATCH (complaints_complaint.search_document) AGAINST (%s IN BOOLEAN MODE)", sql)
+        self.assertIn("+print* +toner*", params)
+
+    def test_mysql_fulltext_skips_unindexed_terms(self):
+        backend = search.MySQLFullTextBackend()
+        queryset = backend.search(Complaint.objects.all(), ["The", "printer", "is", "ok"])
+        self.assertIn("The* +printer* is* ok*", queryset.query.sql_with_params()[1])
+
+        queryset = backend.search(Complaint.objects.all(), ["is", "ok"])
+        sql = str(queryset.query)
+        self.assertNotIn("MATCH", sql)
+        self.assertIn("LIKE", sql)
+
+    def test_snippet_highlights_and_escapes(self):
+        text = "x" * 100 + " the <b>printer</b> is jammed " + "y" * 100
+        excerpt = search.snippet(text, "printer")
+        self.assertIn("&lt;b&gt;<mark>printer</mark>&lt;/b&gt;", excerpt)
+        self.assertTrue(excerpt.startswith("&hellip;"))
+        self.assertTrue(excerpt.endswith("&hellip;"))
+        self.assertEqual(search.snippet(text, ""), "")
+
+
+class KeysetPaginationTests(ComplaintsTestData, TestCase):
+    def walk(self, url, **params):
+        """Follow the load-more links from ``url`` and return every row's pk."""
+        response = self.client.get(url, params)
+        pks = [obj.pk for obj in response.context["page_obj"]]
+        while response.context["page_obj"].has_next():
+            response = self.client.get(response.context["page_obj"].next_url, HTTP_HX_REQUEST="true")
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, "<html")
+            pks += [obj.pk for obj in response.context["page_obj"]]
+        return pks
+
+    def test_pages_have_no_duplicates_or_gaps(self):
+        # Equal timestamps leave the order to the id tie-breaker.
+        Complaint.objects.filter(pk__in=[c.pk for c in self.complaints[:20]]).update(
+            date_added=self.complaint.date_added
+        )
+        self.client.force_login(self.ceo)
+        pks = self.walk(reverse("complaints:all_complaints_display"))
+        self.assertEqual(pks, list(Complaint.objects.order_by("-date_added", "-id").values_list("pk", flat=True)))
+
+        activity = self.walk(reverse("complaints:all_complaints_display"), sort="activity")
+        self.assertCountEqual(activity, pks)
+        self.assertEqual(len(set(activity)), len(activity))
+
+    @mock.patch("complaints.views.AllUserDisplayView.paginate_by", 4)
+    def test_annotated_keyset(self):
+        self.client.force_login(self.ceo)
+        pks = self.walk(reverse("complaints:all_users_display"))
+        self.assertEqual(pks[0], self.ceo.pk)
+        self.assertCountEqual(pks, User.objects.values_list("pk", flat=True))
+
+    def test_activity_sort_keeps_the_search(self):
+        self.client.force_login(self.ceo)
+        url = reverse("complaints:all_complaints_display")
+        response = self.client.get(url, {"search_query": "complaint"})
+        self.assertContains(response, 'href="?sort=activity&amp;search_query=complaint"')
+
+        pks = self.walk(url, search_query="complaint", sort="activity")
+        expected = Complaint.objects.with_last_activity().order_by("-last_activity", "-id")
+        self.assertEqual(pks, list(expected.values_list("pk", flat=True)))
+
+    def test_load_more_fragment(self):
+        self.client.force_login(self.ceo)
+        url = reverse("complaints:all_complaints_display")
+        next_url = self.client.get(url).context["page_obj"].next_url
+        response = self.client.get(next_url, HTTP_HX_REQUEST="true")
+        self.assertTemplateUsed(response, "complaints/complaint_rows.html")
+        self.assertTemplateNotUsed(response, "complaints/base.html")
+        # Without htmx the same link renders the whole page.
+        self.assertTemplateUsed(self.client.get(next_url), "complaints/all_complaints.html")
+
+    def test_tampered_cursors_are_not_found(self):
+        self.client.force_login(self.ceo)
+        url = reverse("complaints:all_complaints_display")
+        for values in (["x", "y"], [1], {"a": 1}, [None, 1], ["2024-01-01T00:00:00", 10**30]):
+            cursor = pagination.encode_cursor(values) if isinstance(values, list) else "e30"
+            with self.subTest(values=values):
+                self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"cursor": "WyJ4IiwieSJd"}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"cursor": "!!!"}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"cursor": "WyJ4Il0", "sort": "activity"}).status_code, 404)
+
+
+class BulkTransitionTests(ComplaintsTestData, TestCase):
+    def test_hod_closes_department_complaints(self):
+        pks = [complaint.pk for complaint in self.complaints[1:6]]
+        self.client.force_login(self.hod)
+        response = self.client.post(
+            reverse("complaints:bulk_transition_complaints"),
+            {"complaints": pks, "status": "Closed", "content": "done"},
+        )
+        self.assertRedirects(response, reverse("complaints:all_complaints_display"))
+        self.assertEqual(
+            Complaint.objects.filter(pk__in=pks, status="Closed").count(), len(pks)
+        )
+        self.assertEqual(Remark.objects.filter(complaint__in=pks, status="Closed").count(), len(pks))
+
+    def test_unauthorized_selection_is_rejected(self):
+        other = Complaint.objects.create(
+            title="hr complaint",
+            description="description",
+            complainant=self.employees[0],
+            targeted_department=self.hr,
+            targeted_personnel=self.employees[2],
+        )
+        self.client.force_login(self.hod)
+        response = self.client.post(
+            reverse("complaints:bulk_transition_complaints"),
+            {"complaints": [self.complaints[1].pk, other.pk], "status": "Closed", "content": "done"},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Complaint.objects.filter(status="Closed").exists())
+
+
+class ExportTests(QueryBudgetMixin, ComplaintsTestData, TestCase):
+    def test_csv_export_streams_history(self):
+        response = self.assertQueryBudget(
+            12, self.hod, reverse("complaints:export_complaints"), format="csv"
+        )
+        with CaptureQueriesContext(connection) as context:
+            rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertLessEqual(len(context.captured_queries), 4)
+        records = [row["record"] for row in rows]
+        self.assertEqual(records.count("complaint"), 30)
+        self.assertEqual(records.count("remark"), 10)
+        self.assertEqual(records.count("history"), DepartmentHistory.objects.count())
+
+    def test_jsonl_export_matches_scope(self):
+        employee = self.employees[0]
+        self.client.force_login(employee)
+        response = self.client.get(reverse("complaints:export_complaints"), {"format": "jsonl"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            {json.loads(line)["complaint_id"] for line in lines},
+            set(Complaint.objects.visible_to(employee).values_list("pk", flat=True)),
+        )
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command("export_complaints", "--format", "jsonl", stdout=output)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(lines), 30)
+        self.assertEqual(len(lines[-1]["remarks"]), 10)
+
+    def test_chunks_continue_after_the_last_complaint(self):
+        # Ties on date_added are broken by id across chunk boundaries.
+        Complaint.objects.filter(pk__in=[c.pk for c in self.complaints[5:15]]).update(
+            date_added=self.complaint.date_added
+        )
+        expected = list(Complaint.objects.order_by("-date_added", "-id").values_list("pk", flat=True))
+        with self.assertNumQueries(5 * 3):
+            exported = [c.pk for c in export.iter_complaints(Complaint.objects.all(), chunk_size=7)]
+        self.assertEqual(exported, expected)
+
+
+class ImportTests(ComplaintsTestData, TestCase):
+    def test_round_trip_and_rejects(self):
+        exported = io.StringIO()
+        call_command("export_complaints", "--user", "hod", stdout=exported)
+        rows = exported.getvalue().splitlines()
+        rows.append("complaint,,,,Opened,bad,desc,nobody,ict,employee1")
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "complaints.csv")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("\n".join(rows))
+
+        output = io.StringIO()
+        call_command(
+            "import_complaints", path, "--batch-size", "7", stdout=output, stderr=io.StringIO()
+        )
+        self.assertIn("Imported 30 complaints, rejected 12.", output.getvalue())
+        self.assertEqual(Complaint.objects.count(), 60)
+        imported = Complaint.objects.order_by("-pk").first()
+        self.assertEqual(imported.search_document, imported.build_search_document())
+        self.assertEqual(
+            imported.date_added, Complaint.objects.get(title=imported.title, pk__lt=imported.pk).date_added
+        )
+
+    def test_jsonl_rejects_non_objects(self):
+        record = {
+            "title": "legacy",
+            "description": "from the old system",
+            "complainant": "employee1",
+            "targeted_department": "ict",
+            "targeted_personnel": "employee2",
+            "date_added": "2020-01-02T03:04:05+00:00",
+        }
+        lines = [
+            "[1, 2]",
+            '"text"',
+            "{broken",
+            json.dumps(record),
+            "null",
+            json.dumps({**record, "date_added": "2023-02-30T10:00:00"}),
+            json.dumps({**record, "date_added": "yesterday"}),
+        ]
+        rejects = []
+        imported, rejected = importer.import_complaints(
+            importer.read_records(io.StringIO("\n".join(lines)), "jsonl"),
+            on_reject=lambda number, error, record: rejects.append((number, error)),
+        )
+        self.assertEqual((imported, rejected), (1, 6))
+        self.assertEqual([number for number, _ in rejects], [1, 2, 3, 5, 6, 7])
+        self.assertIn("expected an object, got list", rejects[0][1])
+        self.assertEqual([error for _, error in rejects[4:]], ["invalid date_added"] * 2)
+        self.assertEqual(Complaint.objects.get(title="legacy").date_added.year, 2020)
+
+
+class DepartmentComplaintStatsTests(ComplaintsTestData, TestCase):
+    def assertStatsMatchComplaints(self):
+        expected = {
+            (row["targeted_department"], row["status"]): row["total"]
+            for row in Complaint.objects.order_by()
+            .values("targeted_department", "status")
+            .annotate(total=Count("id"))
+        }
+        actual = {}
+        for stat in DepartmentComplaintStats.objects.all():
+            for status in ("Opened", "Forwarded", "Closed"):
+                if getattr(stat, status.lower()):
+                    actual[(stat.department_id, status)] = getattr(stat, status.lower())
+        self.assertEqual(actual, expected)
+
+    def test_counters_follow_saves_bulk_transitions_and_deletes(self):
+        self.assertStatsMatchComplaints()
+
+        complaint = Complaint.objects.get(pk=self.complaints[3].pk)
+        complaint.targeted_department = self.hr
+        complaint.save()
+        workflow.bulk_forward(self.complaints[4:10], self.hod, self.hr, self.employees[0], "moved")
+        workflow.bulk_close(self.complaints[8:14], self.hod, "done")
+        workflow.close(Complaint.objects.get(pk=self.complaints[20].pk), self.hod, "done")
+        Complaint.objects.filter(pk__in=[c.pk for c in self.complaints[12:16]]).delete()
+        self.assertStatsMatchComplaints()
+
+        DepartmentComplaintStats.objects.all().update(opened=0)
+        call_command("rebuild_complaint_stats", stdout=io.StringIO())
+        self.assertStatsMatchComplaints()
+
+
+class RemarkSummaryTests(ComplaintsTestData, TestCase):
+    def assertSummary(self, complaint):
+        complaint = Complaint.objects.get(pk=complaint.pk)
+        latest = complaint.remarks.order_by("-date", "-id").first()
+        self.assertEqual(complaint.remark_count, complaint.remarks.count())
+        self.assertEqual(complaint.latest_remark_id, latest.pk if latest else None)
+        self.assertEqual(complaint.latest_remark_at, latest.date if latest else None)
+
+    def test_summary_follows_remarks(self):
+        self.assertSummary(self.complaint)
+        self.remark.delete()
+        self.assertSummary(self.complaint)
+        Remark.objects.filter(complaint=self.complaint).delete()
+        self.assertSummary(self.complaint)
+
+        workflow.bulk_close(self.complaints[:5], self.hod, "done")
+        for complaint in self.complaints[:5]:
+            self.assertSummary(complaint)
+
+    def test_stale_instance_does_not_overwrite_summary(self):
+        complaint = Complaint.objects.get(pk=self.complaints[2].pk)
+        workflow.close(Complaint.objects.get(pk=complaint.pk), self.hod, "done")
+        complaint.title = "renamed"
+        complaint.save()
+        self.assertSummary(complaint)
+
+    def test_sort_by_activity_pages(self):
+        self.client.force_login(self.ceo)
+        url = reverse("complaints:all_complaints_display") + "?sort=activity"
+        response = self.client.get(url)
+        seen = [complaint.pk for complaint in response.context["complaints"]]
+        self.assertEqual(seen[0], self.complaint.pk)
+        response = self.client.get(response.context["page_obj"].next_url, HTTP_HX_REQUEST="true")
+        seen += [complaint.pk for complaint in response.context["complaints"]]
+        self.assertEqual(sorted(seen), sorted(complaint.pk for complaint in self.complaints))
+
+
+class RegionTests(TestCase):
+    def test_lookups(self):
+        region, districts = next(iter(regions.region_districts().items()))
+        self.assertTrue(regions.is_region(region))
+        self.assertTrue(regions.is_district(districts[0], region))
+        self.assertEqual(regions.region_of(districts[0]), region)
+        self.assertFalse(regions.is_region("Atlantis"))
+
+    def test_user_validation(self):
+        region, districts = next(iter(regions.region_districts().items()))
+        other = list(regions.region_districts())[1]
+        user = User(username="someone", password="!", region=region, district=districts[0])
+        user.clean()
+        user.region = other
+        with self.assertRaises(ValidationError) as context:
+            user.clean()
+        self.assertIn("district", context.exception.message_dict)
+
+
+class DepartmentMembersTests(ComplaintsTestData, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.hod)
+        self.url = reverse("complaints:department_members")
+
+    def members(self, department):
+        response = self.client.get(
+            self.url, {"field": "targeted_personnel", "targeted_department": department.pk}
+        )
+        self.assertContains(response, 'name="targeted_personnel"')
+        return [pk for pk, username in response.context["users"]]
+
+    def test_endpoint_lists_department_members_and_is_cached(self):
+        hr = sorted(user.pk for user in self.employees if user.departments_id == self.hr.pk)
+        self.assertEqual(sorted(self.members(self.hr)), hr)
+        with CaptureQueriesContext(connection) as context:
+            members.department_members(self.hr.pk)
+        self.assertEqual(len(context.captured_queries), 0)
+
+        moved = self.employees[0]
+        moved.departments = self.ict
+        moved.save()
+        self.assertNotIn(moved.pk, self.members(self.hr))
+
+    def test_forms_only_offer_department_members(self):
+        form = AddRemarkForm(initial={"complaint": self.complaint})
+        self.assertEqual(
+            set(form.fields["remark_targeted_personnel"].queryset),
+            set(User.objects.filter(departments=self.ict)),
+        )
+        self.assertEqual(list(form.fields["complaint"].queryset), [self.complaint])
+        self.assertFalse(AddComplaintForm().fields["targeted_personnel"].queryset.exists())
+
+
+def failing_task(**payload):
+    raise RuntimeError("boom")
+
+
+class TemporaryStorageMixin:
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(
+            MEDIA_ROOT=os.path.join(directory.name, "media"),
+            ATTACHMENT_ROOT=os.path.join(directory.name, "attachments"),
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+class AttachmentProcessingTests(TemporaryStorageMixin, ComplaintsTestData, TestCase):
+
+    def jpeg_with_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 800), "red").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_is_processed_by_worker(self):
+        remark = Remark.objects.create(
+            complaint=self.complaint,
+            respondent=self.hod,
+            content="see photo",
+            remark_targeted_personnel=self.employees[0],
+            remark_targeted_department=self.ict,
+        )
+        [attachment] = attachments.attach(remark, [self.jpeg_with_exif()], self.hod)
+        uploaded_name = attachment.file.name
+        self.assertTrue(Job.objects.filter(status=Job.PENDING).exists())
+        call_command("run_jobs", "--once", stdout=io.StringIO())
+
+        # The stripped image is stored under the hash of its own bytes.
+        attachment.refresh_from_db()
+        self.assertNotEqual(attachment.file.name, uploaded_name)
+        self.assertFalse(attachment_storage.exists(uploaded_name))
+        with attachment.file.open() as stored:
+            digest = hashlib.sha256(stored.read()).hexdigest()
+        self.assertEqual(attachment.file.name, attachment_storage.hashed_name(digest, "photo.jpg"))
+        [again] = attachments.attach(remark, [self.jpeg_with_exif()], self.hod)
+        self.assertEqual(again.file.name, attachment.file.name)
+        self.assertEqual(again.sha256, attachment.sha256)
+
+        rendition = ImageRendition.objects.get(source=attachment.file.name)
+        self.assertEqual((rendition.width, rendition.height), (1200, 800))
+        with Image.open(rendition.thumbnail.path) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 320)
+        with Image.open(rendition.webp.path) as webp:
+            self.assertEqual(webp.format, "WEBP")
+        with Image.open(attachment.file.path) as original:
+            self.assertEqual(len(original.getexif()), 0)
+
+        self.client.force_login(self.ceo)
+        response = self.client.get(reverse("complaints:complaint_details", args=[self.complaint.pk]))
+        self.assertContains(response, reverse("complaints:attachment", args=[attachment.pk, "thumbnail"]))
+
+    def test_multi_picture_jpeg_is_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        buffer = io.BytesIO()
+        frames = [Image.new("RGB", (400, 300), colour) for colour in ("red", "blue")]
+        frames[0].save(buffer, "MPO", save_all=True, append_images=frames[1:], exif=exif)
+        name = attachment_storage.save("mpo.jpg", ContentFile(buffer.getvalue()))
+
+        rendition = images.process_image(name)
+        self.assertEqual((rendition.width, rendition.height), (400, 300))
+        with attachment_storage.open(rendition.source) as stored, Image.open(stored) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_decompression_bomb_is_skipped(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (100, 100)).save(buffer, "PNG")
+        name = attachment_storage.save("bomb.png", ContentFile(buffer.getvalue()))
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            self.assertIsNone(images.process_image(name))
+        self.assertFalse(ImageRendition.objects.filter(source=name).exists())
+
+    def test_failing_job_is_retried_then_failed(self):
+        job = jobs.enqueue("complaints.tests.failing_task")
+        for _ in range(jobs.MAX_ATTEMPTS):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("boom", job.last_error)
+
+
+class ContentAddressedStorageTests(TemporaryStorageMixin, TestCase):
+    def test_identical_content_stored_concurrently(self):
+        name = attachment_storage.hashed_name("ab" * 32, "notes.txt")
+        self.assertEqual(attachment_storage.save(name, ContentFile(b"notes")), name)
+        # Another writer got there between the existence check and the write.
+        with mock.patch("complaints.storage.os.path.exists", return_value=False):
+            self.assertEqual(attachment_storage.save(name, ContentFile(b"notes")), name)
+        self.assertEqual(os.listdir(os.path.dirname(attachment_storage.path(name))), [os.path.basename(name)])
+        with attachment_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b"notes")
+
+
+class AttachmentUploadTests(TemporaryStorageMixin, ComplaintsTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.employees[1])
+
+    def post_complaint(self, *files):
+        return self.client.post(
+            reverse("complaints:add_complaint"),
+            {
+                "title": "broken chair",
+                "description": "see pictures",
+                "targeted_department": self.ict.pk,
+                "targeted_personnel": self.employees[3].pk,
+                "attachments": list(files),
+            },
+        )
+
+    def image(self, colour):
+        buffer = io.BytesIO()
+        Image.new("RGB", (40, 40), colour).save(buffer, "PNG")
+        return SimpleUploadedFile(f"{colour}.png", buffer.getvalue(), content_type="image/png")
+
+    def test_uploads_are_attached_and_deduplicated(self):
+        response = self.post_complaint(self.image("red"), self.image("blue"))
+        self.assertRedirects(response, reverse("complaints:user_complaints_display"))
+        self.post_complaint(self.image("red"))
+
+        complaints = Complaint.objects.filter(title="broken chair").order_by("pk")
+        first, second = [list(complaint.attachment_files.order_by("pk")) for complaint in complaints]
+        self.assertEqual([attachment.name for attachment in first], ["red.png", "blue.png"])
+        self.assertEqual(second[0].file.name, first[0].file.name)
+        self.assertEqual(second[0].sha256, first[0].sha256)
+        self.assertEqual(Job.objects.count(), 2)
+
+    @override_settings(ATTACHMENT_MAX_FILE_SIZE=100)
+    def test_oversized_upload_is_rejected(self):
+        response = self.post_complaint(self.image("red"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "is larger than")
+        self.assertFalse(Complaint.objects.filter(title="broken chair").exists())
+
+    def test_csrf_is_still_checked(self):
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.client.force_login(self.employees[1])
+        self.assertEqual(self.post_complaint(self.image("red")).status_code, 403)
+
+
+class AttachmentServingTests(TemporaryStorageMixin, ComplaintsTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 40
+        [self.attachment] = attachments.attach(
+            self.complaint,
+            [SimpleUploadedFile("scan.pdf", self.content, content_type="application/pdf")],
+            self.complaint.complainant,
+        )
+        self.url = reverse("complaints:attachment", args=[self.attachment.pk])
+        self.client.force_login(self.complaint.complainant)
+
+    def test_stored_by_content_hash(self):
+        digest = self.attachment.sha256
+        self.assertEqual(self.attachment.file.name, f"{digest[:2]}/{digest[2:4]}/{digest}.pdf")
+
+    def test_full_and_conditional_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["Content-Disposition"].startswith("inline"))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(b"".join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), self.content[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ATTACHMENT_SENDFILE_HEADER="X-Accel-Redirect")
+    def test_offloads_to_web_server(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected/attachments/" + self.attachment.file.name
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_requires_access_to_the_complaint(self):
+        self.client.force_login(User.objects.create_user("outsider", departments=self.hr))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_untrusted_types_are_downloaded(self):
+        [page] = attachments.attach(
+            self.complaint,
+            [SimpleUploadedFile("page.html", b"<script></script>", content_type="text/html")],
+        )
+        response = self.client.get(reverse("complaints:attachment", args=[page.pk]))
+        self.assertTrue(response["Content-Disposition"].startswith("attachment"))
+
+
+class AvatarTests(TemporaryStorageMixin, ComplaintsTestData, TestCase):
+    def picture(self, colour="red"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (3000, 2000), colour).save(buffer, "JPEG")
+        return SimpleUploadedFile("me.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_creates_square_variants(self):
+        user = self.employees[0]
+        user.profile_picture = self.picture()
+        user.save()
+
+        self.assertEqual(len(user.avatar_version), 16)
+        for size in avatars.AVATAR_SIZES:
+            with default_storage.open(avatars.avatar_name(user.avatar_version, size)) as variant:
+                self.assertEqual(Image.open(variant).size, (size, size))
+
+        url = avatars.avatar_url(user, 40)
+        self.assertIn(f"{user.avatar_version}-48.jpg", url)
+        self.assertIn("-128.jpg", avatars.avatar_url(user, 100))
+        self.assertIn("-320.jpg", avatars.avatar_url(user, 1000))
+
+        user.profile_picture = self.picture("blue")
+        user.save()
+        self.assertNotEqual(avatars.avatar_url(user, 40), url)
+
+    @override_settings(ATTACHMENT_MAX_FILE_SIZE=100, ATTACHMENT_MAX_REQUEST_SIZE=100)
+    def test_profile_picture_ignores_attachment_limits(self):
+        user = self.employees[0]
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("complaints:profile_update", args=[user.pk]),
+            {
+                "first_name": "first",
+                "last_name": "last",
+                "username": user.username,
+                "email": "me@example.com",
+                "phone_number": "0700000000",
+                "profile_picture": self.picture(),
+            },
+        )
+        self.assertRedirects(response, reverse("complaints:profile", args=[user.pk]))
+        user.refresh_from_db()
+        self.assertNotEqual(user.profile_picture.name, "default_pic.jpg")
+        self.assertEqual(len(user.avatar_version), 16)
+
+    def test_falls_back_without_variants(self):
+        user = self.employees[0]
+        self.assertEqual(avatars.avatar_url(user, 48), user.profile_picture.url)
+        user.profile_picture = None
+        user.save()
+        self.assertEqual(avatars.avatar_url(user, 48), "/static/default_pic.jpg")
+
+    def test_generate_avatars_command(self):
+        user = self.employees[0]
+        user.profile_picture = self.picture()
+        user.save()
+        User.objects.filter(pk=user.pk).update(avatar_version="")
+
+        call_command("generate_avatars", stdout=io.StringIO())
+        version = User.objects.values_list("avatar_version", flat=True).get(pk=user.pk)
+        self.assertEqual(version, user.avatar_version)
+
+
+class VisibilityTests(ComplaintsTestData, TestCase):
+    def visible(self, user):
+        return set(Complaint.objects.visible_to(user).values_list("pk", flat=True))
+
+    def test_roles(self):
+        self.assertEqual(len(self.visible(self.ceo)), 30)
+        self.assertEqual(self.visible(self.hod), {complaint.pk for complaint in self.complaints})
+
+        outsider = User.objects.create_user("outsider", departments=self.hr)
+        self.assertEqual(self.visible(outsider), set())
+        complaint = self.complaints[5]
+        Remark.objects.create(
+            complaint=complaint,
+            respondent=self.hod,
+            content="please look",
+            remark_targeted_personnel=outsider,
+            remark_targeted_department=self.hr,
+        )
+        self.assertEqual(self.visible(outsider), {complaint.pk})
+
+    def test_hod_sees_department_and_forwarded_complaints(self):
+        hr_head = User.objects.create_user("hr_head", departments=self.hr)
+        hr_head.groups.add(self.groups["HOD"])
+        self.assertEqual(self.visible(hr_head), set())
+
+        self.complaints[3].targeted_department = self.hr
+        self.complaints[3].save()
+        Remark.objects.create(
+            complaint=self.complaints[4],
+            respondent=self.hod,
+            content="hr should see this",
+            remark_targeted_personnel=self.employees[0],
+            remark_targeted_department=self.hr,
+        )
+        self.assertEqual(self.visible(hr_head), {self.complaints[3].pk, self.complaints[4].pk})
+
+    def test_views_agree_with_predicate(self):
+        outsider = User.objects.create_user("outsider", departments=self.hr)
+        outsider.groups.add(self.groups["EMPLOYEE"])
+        self.client.force_login(outsider)
+        for name, pk in (
+            ("complaint_details", self.complaint.pk),
+            ("view_remark_details", self.remark.pk),
+        ):
+            self.assertEqual(self.client.get(reverse(f"complaints:{name}", args=[pk])).status_code, 404)
+        response = self.client.get(reverse("complaints:add_remark", args=[self.complaint.pk]))
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.employees[2])
+        response = self.client.get(reverse("complaints:view_remark_details", args=[self.remark.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+class VisibilityRuleTests(ComplaintsTestData, TestCase):
+    """visible_to() against the per-object rules it replaced, one role at a time."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.complainant, cls.personnel, cls.remark_target, cls.respondent = [
+            User.objects.create_user(name, departments=cls.hr)
+            for name in ("complainant", "personnel", "remark_target", "respondent")
+        ]
+        cls.finance = Department.objects.create(name="finance", description="finance")
+        cls.hr_complaint = Complaint.objects.create(
+            title="hr complaint",
+            description="description",
+            complainant=cls.complainant,
+            targeted_department=cls.hr,
+            targeted_personnel=cls.personnel,
+        )
+        cls.forwarded = Complaint.objects.create(
+            title="forwarded to finance",
+            description="description",
+            complainant=cls.complainant,
+            targeted_department=cls.hr,
+            targeted_personnel=cls.personnel,
+        )
+        Remark.objects.create(
+            complaint=cls.forwarded,
+            respondent=cls.respondent,
+            content="finance should look",
+            remark_targeted_personnel=cls.remark_target,
+            remark_targeted_department=cls.finance,
+        )
+
+    def visible(self, user):
+        return set(Complaint.objects.visible_to(user).values_list("pk", flat=True))
+
+    def make_hod(self, name, department):
+        hod = User.objects.create_user(name, departments=department)
+        hod.groups.add(self.groups["HOD"])
+        return hod
+
+    @staticmethod
+    def old_rule(user, complaint):
+        # The removed views.can_view_complaint, plus remark respondents.
+        remarks = Remark.objects.filter(complaint=complaint)
+        if (
+            user == complaint.complainant
+            or user == complaint.targeted_personnel
+            or user.is_superuser
+            or remarks.filter(remark_targeted_personnel=user).exists()
+            or remarks.filter(respondent=user).exists()
+            or roles.is_ceo(user)
+        ):
+            return True
+        return roles.is_hod(user) and (
+            user.departments_id == complaint.targeted_department_id
+            or remarks.filter(remark_targeted_department_id=user.departments_id).exists()
+        )
+
+    def test_complainant(self):
+        self.assertEqual(self.visible(self.complainant), {self.hr_complaint.pk, self.forwarded.pk})
+
+    def test_targeted_personnel(self):
+        self.assertEqual(self.visible(self.personnel), {self.hr_complaint.pk, self.forwarded.pk})
+
+    def test_remark_target_and_respondent(self):
+        self.assertEqual(self.visible(self.remark_target), {self.forwarded.pk})
+        self.assertEqual(self.visible(self.respondent), {self.forwarded.pk})
+
+    def test_hod_department(self):
+        self.assertEqual(self.visible(self.make_hod("finance_head", self.finance)), {self.forwarded.pk})
+        hr_pks = set(Complaint.objects.filter(targeted_department=self.hr).values_list("pk", flat=True))
+        self.assertEqual(self.visible(self.make_hod("hr_head", self.hr)), hr_pks)
+        self.assertEqual(self.visible(self.make_hod("no_department", None)), set())
+
+    def test_ceo_and_superuser(self):
+        everything = set(Complaint.objects.values_list("pk", flat=True))
+        self.assertEqual(self.visible(self.ceo), everything)
+        self.assertEqual(self.visible(User.objects.create_superuser("root", password="pass")), everything)
+        self.assertEqual(self.visible(AnonymousUser()), set())
+
+    def test_matches_old_rules_for_every_user(self):
+        self.make_hod("finance_head", self.finance)
+        complaints = list(Complaint.objects.all())
+        for user in User.objects.all():
+            expected = {complaint.pk for complaint in complaints if self.old_rule(user, complaint)}
+            with self.subTest(user=user.username):
+                self.assertEqual(self.visible(user), expected)
+
+
+class FragmentCacheTests(ComplaintsTestData, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, len(context.captured_queries)
+
+    def test_sidebar_is_cached_until_departments_change(self):
+        self.client.force_login(self.ceo)
+        url = reverse("complaints:all_users_display")
+        _, cold = self.count_queries(url)
+        _, warm = self.count_queries(url)
+        self.assertEqual(warm, cold - 2)
+
+        Department.objects.create(name="finance", description="finance")
+        response, _ = self.count_queries(url)
+        self.assertContains(response, "FINANCE")
+
+    def test_navigation_follows_role_changes(self):
+        employee = self.employees[0]
+        self.client.force_login(employee)
+        url = reverse("complaints:user_complaints_display")
+        self.assertContains(self.client.get(url), 'id="nav-link-my-complaints"')
+
+        employee.groups.set([self.groups["HOD"]])
+        response = self.client.get(url)
+        self.assertContains(response, 'id="nav-link-department-complaints"')
+        self.assertNotContains(response, 'id="nav-link-my-complaints"')
+
+    def test_navigation_is_shared_by_a_role(self):
+        url = reverse("complaints:user_complaints_display")
+        self.client.force_login(self.employees[0])
+        self.client.get(url)
+        self.employees[0].save()
+        employee_key = make_template_fragment_key("navigation", [False, False, False])
+        self.assertIsNotNone(cache.get(employee_key))
+
+        self.client.force_login(self.employees[1])
+        response = self.client.get(url)
+        self.assertContains(response, 'id="nav-link-my-complaints"')
+        self.assertContains(response, reverse("complaints:profile", args=[self.employees[1].pk]))
+        self.assertNotContains(response, reverse("complaints:profile", args=[self.employees[0].pk]))
+
+
+class TemplateWarmupTests(TestCase):
+    def test_every_project_template_compiles(self):
+        names = warmup.project_template_names()
+        self.assertIn("complaints/base.html", names)
+        self.assertIn("error_templates/403.html", names)
+        self.assertFalse(any(name.startswith("admin/") for name in names))
+
+        compiled, errors, _ = warmup.warm_templates()
+        self.assertEqual(errors, {})
+        self.assertEqual(compiled, len(names))
+
+    def test_production_profile(self):
+        from COMPLAINTSMANAGEMENTSYSTEM.settings import production
+
+        self.assertFalse(production.DEBUG)
+        self.assertTrue(production.DATABASES["default"]["CONN_HEALTH_CHECKS"])
+        self.assertGreater(production.DATABASES["default"]["CONN_MAX_AGE"], 0)
+        [(loader, _)] = production.TEMPLATES[0]["OPTIONS"]["loaders"]
+        self.assertEqual(loader, "django.template.loaders.cached.Loader")
+
+
+class RequestMetricsTests(ComplaintsTestData, TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_requests_are_timed_per_view(self):
+        self.client.force_login(self.ceo)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("complaints:all_complaints_display"))
+        timings = [part.strip() for part in response["Server-Timing"].split(",")]
+        self.assertEqual([part.split(";")[0] for part in timings], ["db", "tpl", "total"])
+        self.assertIn(f'desc="{len(context.captured_queries)} queries"', timings[0])
+
+        [row] = metrics.summary()
+        self.assertEqual(row["view"], "complaints:all_complaints_display")
+        self.assertEqual(row["queries"], len(context.captured_queries))
+        self.assertGreater(row["template_ms"], 0)
+        self.assertEqual(row["kilobytes"], len(response.content) / 1024)
+        self.assertEqual(sum(row["histogram"]), 1)
+
+    def test_metrics_page_is_staff_only(self):
+        url = reverse("complaints:request_metrics")
+        self.client.force_login(self.ceo)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.ceo.is_staff = True
+        self.ceo.save()
+        self.client.get(reverse("complaints:home"))
+        response = self.client.get(url, {"format": "json"})
+        self.assertIn("complaints:home", [row["view"] for row in response.json()["views"]])
+        self.assertContains(self.client.get(url), "complaints:request_metrics")
+
+
+class QueryLogTests(ComplaintsTestData, TestCase):
+    def test_normalize_folds_literals(self):
+        self.assertEqual(
+            querylog.normalize("SELECT *  FROM t WHERE a = 'x' AND b IN (%s, %s) LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?",
+        )
+
+    def test_duplicates_are_traced_to_their_origin(self):
+        queries = querylog.RequestQueries()
+        with connection.execute_wrapper(queries.execute):
+            list(Department.objects.all())
+            list(Department.objects.all())
+        [event] = queries.events
+        self.assertEqual(event["kind"], querylog.DUPLICATE)
+        self.assertEqual(event["origin"]["file"], os.path.join("complaints", "tests.py"))
+        self.assertEqual(event["origin"]["function"], "test_duplicates_are_traced_to_their_origin")
+
+    def test_middleware_logs_and_report_summarises(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "queries.jsonl")
+            with override_settings(QUERY_LOG_PATH=path, SLOW_QUERY_MS=0):
+                self.client.force_login(self.ceo)
+                self.client.get(reverse("complaints:all_complaints_display"))
+            events = list(querylog.read(path))
+            self.assertTrue(events)
+            self.assertEqual({event["kind"] for event in events}, {querylog.SLOW})
+            self.assertEqual({event["view"] for event in events}, {"complaints:all_complaints_display"})
+
+            out = io.StringIO()
+            call_command("query_report", path, "--kind", "slow", stdout=out)
+        self.assertIn("complaints:all_complaints_display", out.getvalue())
+        self.assertIn(f"{len(events)} events", out.getvalue())
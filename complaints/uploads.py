@@ -0,0 +1,69 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+
+class AttachmentUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream every uploaded file to a temporary file in chunks, computing its
+    SHA-256 on the way so deduplication never has to read it again.
+
+    Uploads over ATTACHMENT_MAX_REQUEST_SIZE (judged by Content-Length) or
+    with a file over ATTACHMENT_MAX_FILE_SIZE are abandoned before the rest
+    of the body is read. The reason ends up in ``request.upload_error``.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request.upload_error = None
+        self.too_large = content_length > settings.ATTACHMENT_MAX_REQUEST_SIZE
+        return super().handle_raw_input(input_data, META, content_length, boundary, encoding)
+
+    def new_file(self, *args, **kwargs):
+        if self.too_large:
+            self.abort_upload(
+                f"Uploads are limited to {settings.ATTACHMENT_MAX_REQUEST_SIZE // (1024 * 1024)} MB "
+                "per request."
+            )
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.ATTACHMENT_MAX_FILE_SIZE:
+            self.file.close()
+            self.abort_upload(
+                f"{self.file_name} is larger than "
+                f"{settings.ATTACHMENT_MAX_FILE_SIZE // (1024 * 1024)} MB."
+            )
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+    def abort_upload(self, message):
+        self.request.upload_error = message
+        raise StopUpload(connection_reset=True)
+
+
+def attachment_uploads(view):
+    """
+    Run the view's uploads through AttachmentUploadHandler. Only attachment
+    views get its limits; other uploads keep Django's handlers. The handler
+    has to be installed before the CSRF check reads request.POST, so the
+    check moves inside, as Django's docs describe.
+    """
+    protected = csrf_protect(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, AttachmentUploadHandler(request))
+        return protected(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
@@ -10,6 +10,7 @@ from .views import (
     UserRegistrationDoneView,
     AllUserDisplayView,
     AllComplaintsDisplayView,
+    ComplaintExportView,
     DeleteUserView,
     PasswordChangeCustomView,
     PasswordChangeDoneView,
@@ -26,6 +27,10 @@ from .views import (
     userProfileUpdateView,
     add_complaint,
     add_remark,
+    attachment_file,
+    department_members,
+    bulk_transition_complaints,
+    request_metrics,
     DepartmentCreateView,
     DepartmentUpdateView,
     DepartmentDeleteView,
@@ -52,6 +57,11 @@ urlpatterns = [
         AllComplaintsDisplayView.as_view(),
         name="all_complaints_display",
     ),
+    path(
+        "all-complaints/export/",
+        ComplaintExportView.as_view(),
+        name="export_complaints",
+    ),
     path(
         "delete_complaint/<int:pk>/",
         DeleteComplaintView.as_view(),
@@ -88,6 +98,19 @@ urlpatterns = [
     ),
     path("add-complaint/", add_complaint, name="add_complaint"),
     path("add_remark/<int:complaint_id>/", add_remark, name="add_remark"),
+    path("attachment/<int:pk>/", attachment_file, name="attachment"),
+    re_path(
+        r"^attachment/(?P<pk>\d+)/(?P<variant>thumbnail|webp)/$",
+        attachment_file,
+        name="attachment",
+    ),
+    path("department-members/", department_members, name="department_members"),
+    path(
+        "bulk-transition/",
+        bulk_transition_complaints,
+        name="bulk_transition_complaints",
+    ),
+    path("metrics/", request_metrics, name="request_metrics"),
     path(
         "add-remark-done/", RemarkAddedDone.as_view(), name="remark_added_done"
     ),
@@ -1,5 +1,8 @@
+import os
+
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views.generic import (
+    View,
     TemplateView,
     CreateView,
     ListView,
@@ -7,19 +10,35 @@ from django.views.generic import (
     DeleteView,
     UpdateView,
 )
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.views import LoginView, PasswordChangeView
 from django.contrib.auth.models import Group
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db.models import IntegerField
-from django.db.models import Case, When, Value, CharField
-from django.db.models import Q, Subquery
+from django.db.models import Case, When, Value
+from django.db.models import Q
+from django.db import transaction
 from django.urls import reverse, reverse_lazy
-from django.http import HttpResponseForbidden, JsonResponse, Http404
-from mtaa import tanzania
-from .models import Complaint, Department, Remark, User
+from django.http import HttpResponseForbidden, JsonResponse, Http404, StreamingHttpResponse
+from .models import Attachment, Complaint, Department, ImageRendition, Remark, User
+from .pagination import KeysetPaginationMixin
+from .uploads import attachment_uploads
+from .roles import EMPLOYEE, group_id, is_ceo, is_hod, sees_all_complaints
+from . import search
+from .services import (
+    attachments,
+    downloads,
+    export,
+    listing,
+    members,
+    metrics,
+    statistics,
+    workflow,
+)
 from .forms import (
+    DEPARTMENT_PERSONNEL_FIELDS,
     DepartmentForm,
     UserProfileForm,
     CEORegistrationForm,
@@ -30,6 +49,7 @@ from .forms import (
     AddComplaintForm,
     UpdateComplaintForm,
     AddRemarkForm,
+    BulkTransitionForm,
     UpdateRemarkForm,
 )
 from django.core.exceptions import PermissionDenied
@@ -50,22 +70,20 @@ def custom_500_view(request, exception=None):
 
 def add_user_to_group(user, group_name):
     try:
-        group = Group.objects.get(name=group_name)
+        pk = group_id(str(group_name))
     except Group.DoesNotExist:
         pass
     else:
-        group.user_set.add(user)
+        user.groups.add(pk)
 
 
 class IndexView(TemplateView):
     template_name = "complaints/index.html"
 
 
-class HomeView(PermissionRequiredMixin, ListView):
+class HomeView(PermissionRequiredMixin, TemplateView):
     permission_required = "complaints.add_complaint"
-    model = Complaint
     template_name = "complaints/home.html"
-    context_object_name = "complaints"
 
 
 class UserLoginView(LoginView):
@@ -81,26 +99,20 @@ class UserRegistrationView(PermissionRequiredMixin, CreateView):
     template_name = "complaints/user_registration_dialog.html"
 
     def get_form_class(self):
-        for group in self.request.user.groups.all():
-            user_type = group.name if self.request.user.is_authenticated else "CEO"
-            if user_type == "CEO" or self.request.user.is_superuser:
-                return CEORegistrationForm
-            elif user_type == "HOD":
-                return HODRegistrationForm
+        user = self.request.user
+        if is_ceo(user) or user.is_superuser:
+            return CEORegistrationForm
+        elif is_hod(user):
+            return HODRegistrationForm
 
     def form_valid(self, form):
         user = form.save(commit=False)
 
-        user_groups = self.request.user.groups.all()
-
-        if user_groups.exists():
-            user_group = user_groups[0]
-
         department = form.cleaned_data.get("department")
 
         user.save()
 
-        if user_group and (user_group.name == "CEO" or self.request.user.is_superuser):
+        if is_ceo(self.request.user) or self.request.user.is_superuser:
             user.departments = department
             group = form.cleaned_data.get("group")
 
@@ -111,9 +123,9 @@ class UserRegistrationView(PermissionRequiredMixin, CreateView):
             else:
                 add_user_to_group(user, group)
                 user.save()
-        elif user_group and user_group.name == "HOD":
+        elif is_hod(self.request.user):
             user.departments = self.request.user.departments
-            user.groups.set([Group.objects.get(name="EMPLOYEE")])
+            user.groups.set([group_id(EMPLOYEE)])
             user.save()
 
         messages.success(self.request, "User registered successfully.")
@@ -196,11 +208,13 @@ class PasswordChangeDoneView(LoginRequiredMixin, TemplateView):
     template_name = "complaints/password_change_done.html"
 
 
-class AllUserDisplayView(PermissionRequiredMixin, ListView):
+class AllUserDisplayView(PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     permission_required = "complaints.view_user"
     template_name = "complaints/all_users.html"
+    fragment_template_name = "complaints/user_rows.html"
     model = User
     context_object_name = "users"
+    keyset = ("is_logged_in_user", "order", "username", "id")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -223,7 +237,7 @@ class AllUserDisplayView(PermissionRequiredMixin, ListView):
             )
         )
 
-        if user.groups.filter(name="HOD").exists():
+        if is_hod(user):
             department = user.departments
             if department:
                 queryset = queryset.exclude(departments=None)
@@ -235,9 +249,9 @@ class AllUserDisplayView(PermissionRequiredMixin, ListView):
             is_logged_in_user=Case(
                 When(pk=user.pk, then=Value(0)),
                 default=Value(1),
-                output_field=CharField(),
+                output_field=IntegerField(),
             )
-        ).order_by("is_logged_in_user", "order", "username")
+        )
 
         if search_query:
             queryset = queryset.filter(
@@ -248,82 +262,85 @@ class AllUserDisplayView(PermissionRequiredMixin, ListView):
             )
 
         queryset = queryset.filter(is_superuser=False)
-        return queryset
+        return queryset.select_related("departments").prefetch_related("groups")
 
 
-class AllComplaintsDisplayView(PermissionRequiredMixin, ListView):
+class ComplaintSearchMixin:
+    activity_keyset = ("-last_activity", "-id")
+
+    def sort_by_activity(self):
+        return self.request.GET.get("sort") == "activity"
+
+    def get_keyset(self):
+        # An explicit sort wins over search relevance.
+        if self.sort_by_activity():
+            return self.activity_keyset
+        if search.search_terms(self.request.GET.get("search_query")):
+            return search.RANKED_KEYSET
+        return super().get_keyset()
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.sort_by_activity():
+            queryset = queryset.with_last_activity()
+        return super().paginate_queryset(queryset, page_size)
+
+
+class AllComplaintsDisplayView(
+    PermissionRequiredMixin, ComplaintSearchMixin, KeysetPaginationMixin, ListView
+):
     permission_required = "complaints.view_user"
     model = Complaint
     template_name = "complaints/all_complaints.html"
+    fragment_template_name = "complaints/complaint_rows.html"
     context_object_name = "complaints"
+    keyset = ("-date_added", "-id")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["user_search_form"] = SearchForm(self.request.GET)
+        context["bulk_form"] = BulkTransitionForm()
 
-        user_counts = {}
-
-        queryset = self.get_queryset()
-        for complaint in queryset:
-            user = complaint.targeted_personnel
-            if user in user_counts:
-                user_counts[user] += 1
-            else:
-                user_counts[user] = 1
-
-        context["user_counts"] = user_counts
-
-        user_with_most_complaints = max(user_counts, key=user_counts.get)
-        context["user_with_most_complaints"] = user_with_most_complaints
-
-        queryset = self.get_queryset()
-        complaint = queryset.first()
-        remarks = complaint.remarks.all() if complaint else []
-        latest_remark = remarks.last()
-        latest_status = (
-            latest_remark.status
-            if latest_remark
-            else complaint.status
-            if complaint
-            else None
+        context["user_with_most_complaints"] = statistics.personnel_with_most_complaints(
+            self.object_list
         )
-
-        context["remarks"] = remarks
-        context["latest_status"] = latest_status
+        user = self.request.user
+        if sees_all_complaints(user):
+            context["department_stats"] = statistics.department_stats()
+        elif user.departments_id:
+            context["department_stats"] = statistics.department_stats([user.departments_id])
 
         return context
 
     def get_queryset(self):
-        user = self.request.user
-        search_query = self.request.GET.get("search_query")
+        return listing.scoped_complaints(
+            self.request.user, self.request.GET.get("search_query")
+        ).with_related()
 
-        if user.groups.filter(name="CEO").exists() or user.is_superuser:
-            queryset = Complaint.objects.all()
-        elif user.groups.filter(name="HOD").exists():
-            department = user.departments
-            if department:
-                queryset = Complaint.objects.filter(targeted_department=department)
-            else:
-                queryset = Complaint.objects.none()
-        else:
-            queryset = Complaint.objects.none()
 
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query)
-                | Q(description__icontains=search_query)
-                | Q(complainant__username__icontains=search_query)
-                | Q(targeted_department__name__icontains=search_query)
-                | Q(targeted_personnel__username__icontains=search_query)
-            )
+class ComplaintExportView(PermissionRequiredMixin, View):
+    permission_required = "complaints.view_user"
 
-        return queryset
+    def get(self, request):
+        format = request.GET.get("format", "csv")
+        if format not in export.CONTENT_TYPES:
+            raise Http404("Unknown export format.")
+        queryset = listing.scoped_complaints(request.user, request.GET.get("search_query"))
+        response = StreamingHttpResponse(
+            export.export_complaints(queryset, format),
+            content_type=export.CONTENT_TYPES[format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="complaints.{format}"'
+        return response
 
 
-class UserComplaintsDisplayView(LoginRequiredMixin, ListView):
+class UserComplaintsDisplayView(
+    LoginRequiredMixin, ComplaintSearchMixin, KeysetPaginationMixin, ListView
+):
     model = Complaint
     template_name = "complaints/my_complaints.html"
+    fragment_template_name = "complaints/complaint_rows.html"
     context_object_name = "complaints"
+    keyset = ("-date_added", "-id")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -332,29 +349,10 @@ class UserComplaintsDisplayView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         search_query = self.request.GET.get("search_query")
-        print("Search Query:", search_query)
-
-        user_remarks_subquery = Remark.objects.filter(
-            remark_targeted_personnel=self.request.user
-        ).values("complaint_id")
-
-        queryset = Complaint.objects.filter(
-            Q(complainant=self.request.user)
-            | Q(targeted_personnel=self.request.user)
-            | Q(id__in=Subquery(user_remarks_subquery))
-        ).order_by("-date_added")
-
+        queryset = Complaint.objects.involving(self.request.user)
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query)
-                | Q(description__icontains=search_query)
-                | Q(complainant__username__icontains=search_query)
-                | Q(targeted_department__name__icontains=search_query)
-                | Q(targeted_personnel__username__icontains=search_query)
-            )
-            print("Filtered Queryset Count:", queryset.count())
-
-        return queryset
+            queryset = search.search_complaints(queryset, search_query)
+        return queryset.with_related()
 
 
 class DeleteComplaintView(PermissionRequiredMixin, DeleteView):
@@ -406,48 +404,33 @@ class ComplaintDetailsView(PermissionRequiredMixin, DetailView):
     template_name = "complaints/complaint_details.html"
     context_object_name = "complaint"
 
-    def get_object(self, queryset=None):
-        complaint = super().get_object(queryset=queryset)
-        user = self.request.user
-
-        if (
-            user == complaint.complainant
-            or user == complaint.targeted_personnel
-            or user.is_superuser
-            or Remark.objects.filter(
-                complaint=complaint, remark_targeted_personnel=user
-            ).exists()
-        ):
-            return complaint
-        elif user.groups.filter(name="CEO").exists():
-            return complaint
-        elif user.groups.filter(name="HOD").exists() and (
-            user.departments == complaint.targeted_department
-            or Remark.objects.filter(
-                complaint=complaint, remark_targeted_department=user.departments
-            ).exists()
-        ):
-            return complaint
-        else:
-            raise Http404("You are not allowed to view this complaint.")
+    def get_queryset(self):
+        return (
+            Complaint.objects.visible_to(self.request.user)
+            .with_related()
+            .select_related("latest_remark")
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        complaint = self.get_object()
-        remarks = complaint.remarks.all()
+        complaint = self.object
+        latest_remark = complaint.latest_remark
 
-        latest_remark = remarks.last()
-        latest_status = latest_remark.status if latest_remark else complaint.status
+        remarks = list(complaint.remarks.with_related().order_by("date", "id"))
+        attachments.attachments_for([complaint, *remarks])
 
         context["remarks"] = remarks
-        context["latest_status"] = latest_status
+        context["latest_status"] = latest_remark.status if latest_remark else complaint.status
         return context
 
 
 @login_required
+@attachment_uploads
 def add_complaint(request):
     if request.method == "POST":
         form = AddComplaintForm(request.POST, request.FILES)
+        if getattr(request, "upload_error", None):
+            form.add_error(None, request.upload_error)
         if form.is_valid():
             complaint = Complaint(
                 title=form.cleaned_data["title"],
@@ -458,14 +441,11 @@ def add_complaint(request):
                 status="Opened",
             )
 
-            complaint.save()
-            
-            for uploaded_file in request.FILES.getlist('attachments'):
-                attachment = Complaint(
-                    attachments=uploaded_file,
+            with transaction.atomic():
+                complaint.save()
+                attachments.attach(
+                    complaint, request.FILES.getlist("attachments"), request.user
                 )
-                attachment.save()
-                complaint.attachments.add(attachment)
 
             return redirect("complaints:user_complaints_display")
 
@@ -476,33 +456,90 @@ def add_complaint(request):
     return render(request, "complaints/add_complaint_dialog.html", context)
 
 
-def is_authorized_user(user, complaint):
-    if user == complaint.complainant:
-        return True
+@login_required
+def attachment_file(request, pk, variant=None):
+    attachment = get_object_or_404(Attachment.objects.visible_to(request.user), pk=pk)
+    name = attachment.file.name
+    filename = attachment.name
+    if variant:
+        rendition = get_object_or_404(ImageRendition, source=name)
+        name = getattr(rendition, variant).name
+        filename = os.path.splitext(filename)[0] + os.path.splitext(name)[1]
+    return downloads.serve(request, attachment.file.storage, name, filename)
+
+
+@user_passes_test(lambda user: user.is_staff)
+def request_metrics(request):
+    rows = metrics.summary()
+    if request.GET.get("format") == "json":
+        return JsonResponse({"buckets_ms": metrics.BUCKETS_MS, "views": rows})
+    context = {
+        "rows": rows,
+        "buckets": metrics.bucket_labels(),
+        "window": settings.REQUEST_METRICS_WINDOW,
+    }
+    return render(request, "complaints/request_metrics.html", context)
+
+
+@login_required
+def department_members(request):
+    field = request.GET.get("field")
+    if field not in DEPARTMENT_PERSONNEL_FIELDS:
+        raise Http404("Unknown field.")
+    try:
+        department_id = int(request.GET.get(DEPARTMENT_PERSONNEL_FIELDS[field], ""))
+    except ValueError:
+        users = []
+    else:
+        users = members.department_members(department_id)
+    context = {"field": field, "users": users}
+    return render(request, "complaints/department_members_options.html", context)
 
-    if (
-        user.groups.filter(name="HOD").exists()
-        and user.departments == complaint.targeted_department
-    ):
-        return True
 
-    if user.is_superuser or user.groups.filter(name="CEO").exists():
-        return True
+@login_required
+def bulk_transition_complaints(request):
+    if request.method != "POST":
+        return redirect("complaints:all_complaints_display")
+
+    form = BulkTransitionForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect("complaints:all_complaints_display")
+
+    pks = [complaint.pk for complaint in form.cleaned_data["complaints"]]
+    if Complaint.objects.visible_to(request.user).filter(pk__in=pks).count() != len(pks):
+        return render(request, 'error_templates/403.html', status=403)
 
-    if Remark.objects.filter(complaint=complaint, remark_targeted_personnel=user).exists():
-        return True
+    status = form.cleaned_data["status"]
+    content = form.cleaned_data["content"]
+    if status == workflow.CLOSED:
+        remarks = workflow.bulk_close(pks, request.user, content)
+    else:
+        remarks = workflow.bulk_forward(
+            pks,
+            request.user,
+            form.cleaned_data["remark_targeted_department"],
+            form.cleaned_data["remark_targeted_personnel"],
+            content,
+        )
 
-    return False
+    messages.success(request, f"{len(remarks)} complaint(s) {status.lower()}.")
+    return redirect("complaints:all_complaints_display")
 
 
 @login_required
+@attachment_uploads
 def add_remark(request, complaint_id):
     complaint = get_object_or_404(Complaint, pk=complaint_id)
-    if is_authorized_user(request.user, complaint):
+    if Complaint.objects.visible_to(request.user).filter(pk=complaint.pk).exists():
         if request.method == "POST":
             form = AddRemarkForm(
                 request.POST, request.FILES, initial={"complaint": complaint}
             )
+            if getattr(request, "upload_error", None):
+                form.add_error(None, request.upload_error)
             if form.is_valid():
                 remark = Remark(
                     complaint=form.cleaned_data["complaint"],
@@ -516,14 +553,11 @@ def add_remark(request, complaint_id):
                     ],
                     status=form.cleaned_data["status"],
                 )
-                remark.save()
-
-                for uploaded_file in request.FILES.getlist('attachments'):
-                    attachment = Remark(
-                        attachments=uploaded_file,
+                with transaction.atomic():
+                    workflow.add_remark(remark)
+                    attachments.attach(
+                        remark, request.FILES.getlist("attachments"), request.user
                     )
-                    attachment.save()
-                    remark.attachments.add(attachment)
 
                 return redirect('complaints:complaint_details', pk=complaint.pk)
         else:
@@ -546,34 +580,8 @@ class RemarkDetailView(PermissionRequiredMixin, DetailView):
     template_name = "complaints/remark_details.html"
     context_object_name = "remark"
 
-    def get_object(self, queryset=None):
-        remark = super().get_object(queryset=queryset)
-        user = self.request.user
-
-        if (
-            user == remark.respondent
-            or user == remark.remark_targeted_personnel
-            or user.is_superuser
-            or user == remark.complaint.complainant
-            or user == remark.complaint.targeted_personnel
-        ):
-            return remark
-        elif user.groups.filter(name="CEO").exists():
-            return remark
-        elif user.groups.filter(name="HOD").exists() and (
-            user.departments == remark.respondent.departments
-            or remark.respondent.is_superuser
-            or remark.respondent.groups.filter(name="CEO").exists()
-        ):
-            return remark
-        elif user.groups.filter(name="HOD").exists() and (
-            user.departments == remark.complaint.complainant.departments
-            or remark.complaint.complainant.is_superuser
-            or remark.complaint.complainant.groups.filter(name="CEO").exists()
-        ):
-            return remark
-        else:
-            raise Http404("You are not allowed to view this remark.")
+    def get_queryset(self):
+        return Remark.objects.visible_to(self.request.user).with_related()
 
 
 class UpdateRemarkView(PermissionRequiredMixin, UpdateView):
@@ -618,13 +626,7 @@ class DeleteRemarkView(PermissionRequiredMixin, DeleteView):
 
 
 def has_special_permission(user):
-    if (
-        user.is_superuser
-        or user.groups.filter(name="CEO").exists()
-        or user.groups.filter(name="HOD").exists()
-    ):
-        return True
-    return False
+    return user.is_superuser or is_ceo(user) or is_hod(user)
 
 
 class StaffUserProfileView(PermissionRequiredMixin, DetailView):
@@ -640,12 +642,7 @@ class StaffUserProfileView(PermissionRequiredMixin, DetailView):
 
 
 def ceo_special_permission(user):
-    if (
-        user.is_superuser
-        or user.groups.filter(name="CEO").exists()
-    ):
-        return True
-    return False
+    return user.is_superuser or is_ceo(user)
 
 
 class DepartmentDetailsView(PermissionRequiredMixin, DetailView):
@@ -0,0 +1,48 @@
+import os
+import time
+
+from django.conf import settings
+from django.template import engines
+
+
+def _loader_dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, "loaders"):
+            yield from _loader_dirs(loader.loaders)
+        else:
+            yield from loader.get_dirs()
+
+
+def project_template_names(engine=None):
+    """Names of the templates under BASE_DIR that the engine can load."""
+    engine = engine or engines["django"].engine
+    names = set()
+    for directory in _loader_dirs(engine.template_loaders):
+        directory = os.path.abspath(directory)
+        if not directory.startswith(os.path.abspath(settings.BASE_DIR)):
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith((".html", ".txt")):
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory).replace(os.sep, "/"))
+    return sorted(names)
+
+
+def warm_templates(engine=None):
+    """
+    Compile every project template so the cached loader holds them all.
+    Returns (compiled count, {name: error}, seconds).
+    """
+    engine = engine or engines["django"].engine
+    started = time.perf_counter()
+    compiled = 0
+    errors = {}
+    for name in project_template_names(engine):
+        try:
+            engine.get_template(name)
+        except Exception as error:
+            errors[name] = error
+        else:
+            compiled += 1
+    return compiled, errors, time.perf_counter() - started